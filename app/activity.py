@@ -0,0 +1,200 @@
+"""Activity rollups: history row counts per hour and per day, by entity type, operation and user.
+
+`activity_rollups` is filled by a catch-up job, outside the write transactions: it counts the
+`entity_versions` rows after its high-water mark (`activity_rollup_state`), upserts one row
+per touched bucket and advances the mark, one short transaction per batch. Writers never
+touch the shared bucket rows. Dashboards read these rows instead of grouping `entity_versions`.
+
+    flask --app app/app.py history roll-up --loop --interval 60
+    flask --app app/app.py history rebuild-rollups
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+import time
+
+import click
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from history import history_cli
+from models import ActivityRollup, ActivityRollupState, EntityVersion, db
+
+BUCKETS = ("hour", "day")
+REBUILD_BATCH_SIZE = 5000
+STATE_ID = 1
+
+
+def bucket_start(bucket, moment):
+    if bucket == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _count(counts, changed_at, entity_type, operation, changed_by):
+    for bucket in BUCKETS:
+        counts[(bucket, bucket_start(bucket, changed_at), entity_type, operation, changed_by or "")] += 1
+
+
+def _rollup_rows(counts):
+    """Rows in unique-key order, so concurrent upserts lock shared buckets in the same order."""
+    return [
+        {"bucket": bucket, "bucket_start": start, "entity_type": entity_type,
+         "operation": operation, "changed_by": changed_by, "count": count}
+        for (bucket, start, entity_type, operation, changed_by), count in sorted(counts.items())
+    ]
+
+
+def _upsert(connection, rows):
+    table = ActivityRollup.__table__
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update(count=table.c.count + statement.inserted["count"])
+    elif dialect in ("sqlite", "postgresql"):
+        statement = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=["bucket", "bucket_start", "entity_type", "operation", "changed_by"],
+            set_={"count": table.c.count + statement.excluded["count"]},
+        )
+    else:
+        # Only the rollup job gets here, never a write; the mark is not advanced.
+        raise NotImplementedError(f"activity rollups do not support {dialect}")
+    connection.execute(statement, rows)
+
+
+def _lock_state(session):
+    """last_version_id of the rollup job, with the state row locked until commit."""
+    table = ActivityRollupState.__table__
+    last_id = session.execute(
+        select(table.c.last_version_id).where(table.c.id == STATE_ID).with_for_update()
+    ).scalar()
+    if last_id is None:
+        session.execute(insert(table).values(id=STATE_ID, last_version_id=0, updated_at=datetime.utcnow()))
+        last_id = 0
+    return last_id
+
+
+def _save_state(session, last_id):
+    table = ActivityRollupState.__table__
+    session.execute(
+        update(table).where(table.c.id == STATE_ID).values(last_version_id=last_id, updated_at=datetime.utcnow())
+    )
+
+
+def roll_up_pending(session, settle_seconds, batch_size=REBUILD_BATCH_SIZE, log=None):
+    """Count history rows after the high-water mark into the rollups; returns rows counted.
+
+    Each batch is one transaction holding the state row lock, so concurrent runs wait for each
+    other instead of counting rows twice. Rows younger than `settle_seconds` are left for the
+    next run: a transaction still in flight may hold a lower id (as for /api/sync).
+    """
+    total = 0
+    while True:
+        horizon = datetime.utcnow() - timedelta(seconds=settle_seconds)
+        try:
+            last_id = _lock_state(session)
+            rows = session.execute(
+                select(
+                    EntityVersion.id, EntityVersion.changed_at, EntityVersion.entity_type,
+                    EntityVersion.operation, EntityVersion.changed_by,
+                )
+                .where(EntityVersion.id > last_id)
+                .order_by(EntityVersion.id)
+                .limit(batch_size)
+            ).all()
+            settled = next((index for index, row in enumerate(rows) if row.changed_at > horizon), len(rows))
+            if not settled:
+                session.rollback()
+                return total
+            counts = Counter()
+            for row in rows[:settled]:
+                _count(counts, row.changed_at, row.entity_type, row.operation, row.changed_by)
+            _upsert(session.connection(), _rollup_rows(counts))
+            _save_state(session, rows[settled - 1].id)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        total += settled
+        if log:
+            log(f"{total} history rows rolled up (id {rows[settled - 1].id})")
+        if settled < batch_size:
+            return total
+
+
+def activity(session, bucket, since, until, entity_type=None, operation=None, who=None):
+    """Rollup rows for buckets starting in [since, until), oldest first."""
+    query = session.query(ActivityRollup).filter(
+        ActivityRollup.bucket == bucket,
+        ActivityRollup.bucket_start >= bucket_start(bucket, since),
+        ActivityRollup.bucket_start < until,
+    )
+    if entity_type:
+        query = query.filter(ActivityRollup.entity_type == entity_type)
+    if operation:
+        query = query.filter(ActivityRollup.operation == operation)
+    if who:
+        query = query.filter(ActivityRollup.changed_by == who)
+    return query.order_by(ActivityRollup.bucket_start, ActivityRollup.id).all()
+
+
+def rebuild_rollups(session, batch_size=REBUILD_BATCH_SIZE, log=None):
+    """Recount all rollups from `entity_versions` in one transaction; returns rows scanned.
+
+    Counts are accumulated in memory (one entry per bucket, not per history row) while the
+    history is streamed in id order, and the job's mark is set to the last row counted. Holds
+    the job's state lock; changes committed while it runs can be missed, so run it when writes
+    are paused.
+    """
+    _lock_state(session)
+    counts = Counter()
+    scanned = 0
+    last_id = 0
+    rows = session.execute(
+        db.select(
+            EntityVersion.id, EntityVersion.changed_at, EntityVersion.entity_type,
+            EntityVersion.operation, EntityVersion.changed_by,
+        ).order_by(EntityVersion.id).execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for row in rows:
+        _count(counts, row.changed_at, row.entity_type, row.operation, row.changed_by)
+        scanned += 1
+        last_id = row.id
+        if log and scanned % batch_size == 0:
+            log(f"{scanned} history rows counted")
+    session.execute(delete(ActivityRollup.__table__))
+    rollups = _rollup_rows(counts)
+    for start in range(0, len(rollups), batch_size):
+        session.execute(insert(ActivityRollup.__table__), rollups[start:start + batch_size])
+    _save_state(session, last_id)
+    session.commit()
+    return scanned
+
+
+@history_cli.command("roll-up")
+@click.option("--batch-size", type=int, default=REBUILD_BATCH_SIZE, show_default=True, help="History rows per transaction.")
+@click.option("--loop", is_flag=True, help="Keep running, one pass every --interval seconds.")
+@click.option("--interval", type=float, default=None, help="Seconds between passes with --loop (default ACTIVITY_ROLLUP_INTERVAL).")
+def roll_up_command(batch_size, loop, interval):
+    """Add history rows written since the last run to activity_rollups."""
+    config = current_app.config
+    interval = interval if interval is not None else config["ACTIVITY_ROLLUP_INTERVAL"]
+    while True:
+        try:
+            counted = roll_up_pending(db.session, config["ACTIVITY_ROLLUP_SETTLE_SECONDS"], batch_size=batch_size)
+        except NotImplementedError as exc:
+            raise click.ClickException(str(exc))
+        click.echo(f"{counted} history rows rolled up")
+        if not loop:
+            break
+        time.sleep(interval)
+
+
+@history_cli.command("rebuild-rollups")
+@click.option("--batch-size", type=int, default=REBUILD_BATCH_SIZE, show_default=True, help="Rows per fetch/insert.")
+def rebuild_rollups_command(batch_size):
+    """Recompute activity_rollups from the full history (after restores or manual edits)."""
+    started = datetime.utcnow()
+    scanned = rebuild_rollups(db.session, batch_size=batch_size, log=click.echo)
+    click.echo(f"{scanned} history rows rolled up in {(datetime.utcnow() - started).total_seconds():.1f}s")
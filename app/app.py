@@ -1,11 +1,14 @@
+from datetime import datetime, timedelta
 import os
 from pathlib import Path
 import sys
-from flask import Blueprint, Flask, flash, jsonify, request, redirect, session, url_for, send_from_directory
+from types import SimpleNamespace
+from flask import Blueprint, Flask, current_app, flash, jsonify, request, redirect, session, url_for, send_from_directory
 from flask_migrate import Migrate
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
+    get_jwt,
     get_jwt_identity,
     verify_jwt_in_request,
 )
@@ -16,37 +19,95 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import StaleDataError
 
+from activity import activity
+from audit import audit_cli, checkpoint_tree, checkpoint_trees
+from bulk import bulk_membership, bulk_soft_delete, bulk_update, conditional_update, insert_entity
+from coalescing import coalesced, read_coalescing
 from config import Config
-from models import db, Asset, EntityVersion, Signal, OptimisticLockError
+from group_commit import GroupCommitTimeout, group_commit
+from history import (
+    diff_cache,
+    dump_version,
+    history_cache,
+    history_cli,
+    select_versions,
+    summaries_for,
+    version_diff,
+    version_cache_control,
+    version_history,
+)
+from importer import import_cli
+from json_provider import init_json_provider
+from jwt_cache import bearer_token, install_verified_jwt, jwt_cache
+from merge import merge_stale_patch
+from merkle import proof_from_levels
+from replicas import mark_sticky, replica_cli, route_request
+from retention import trash_cli
+from search import search_assets, search_cli
+from models import (
+    db,
+    Asset,
+    EntityVersion,
+    HistoryCheckpoint,
+    Signal,
+    OptimisticLockError,
+    versioned_info,
+    versioned_model,
+)
 from schemas import (
+    ActivityBucketResponse,
+    ActivityQuery,
+    AssetBulkUpdateRequest,
+    AssetMembershipRequest,
+    AssetMembershipResponse,
+    AssetResponse,
+    AssetSearchQuery,
+    AssetSearchResponse,
+    AssetSignalsRequest,
+    BulkDeleteRequest,
+    BulkResultResponse,
+    ChangeRecordResponse,
+    ChangesQuery,
     ErrorResponse,
     LoginRequest,
     LoginResponse,
+    MergeConflictResponse,
     SessionResponse,
+    SignalBulkUpdateRequest,
+    SignalResponse,
+    SyncResponse,
+    TrashItemResponse,
+    VersionDiffResponse,
+    VersionProofResponse,
     SignalCreateRequest,
     SignalUpdateRequest,
     AssetCreateRequest,
     AssetUpdateRequest,
     signal_to_response,
     asset_to_response,
-    version_to_response,
     change_record_to_response,
+    tombstone_to_response,
+    activity_to_response,
 )
+from serializers import dump_list, dump_one, json_response
 
-app = Flask(__name__, static_folder=str(Path(__file__).resolve().parent / "static"), static_url_path="/static")
-app.config.from_object(Config)
+STATIC_FOLDER = Path(__file__).resolve().parent / "static"
 
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
+migrate = Migrate()
+jwt = JWTManager()
 api_spec = FlaskPydanticSpec("flask", title="Versioning API", version="1.0", path="apidoc")
 
-ENTITY_MODELS = {
-    "signals": Signal,
-    "assets": Asset,
-}
+SYNC_DEFAULT_LIMIT = 500
+SYNC_MAX_LIMIT = 1000
+
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(jwt_header, jwt_payload):
+    return jwt_cache.is_revoked(jwt_payload.get("jti"))
 
 
 def _active_user():
@@ -93,7 +154,60 @@ def _check_lock_version(entity, expected_version):
     return None
 
 
-@app.errorhandler(OptimisticLockError)
+def _merge_conflict_response(entity, conflicts):
+    body = MergeConflictResponse(error=CONFLICT_MSG, conflicts=conflicts, lock_version=entity.lock_version)
+    return jsonify(body.model_dump()), 409
+
+
+def _patch_changes(entity, req):
+    """Return (changes, None) for an update request, or (None, 409 response) if it is stale.
+
+    With `merge` set, a stale request is rebased onto the current version instead (see merge.py).
+    """
+    expected = _expected_lock_version_from_request()
+    patch = req.model_dump(exclude={"lock_version", "merge"}, exclude_none=True)
+    if not req.merge or entity.lock_version == expected:
+        conflict = _check_lock_version(entity, expected)
+        return (None, conflict) if conflict is not None else (patch, None)
+    changes, conflicts = merge_stale_patch(db.session, entity, expected, patch)
+    if conflicts:
+        return None, _merge_conflict_response(entity, conflicts)
+    return changes, None
+
+
+def _conditional_patch(model, entity_id, req, not_found, to_response):
+    """Scalar-field PATCH in one conditional UPDATE (bulk.conditional_update), without loading
+    the entity. Returns None when the ORM path is needed: merges, `signal_ids`, empty patches
+    and entities without history. With group commit the update runs in the next group
+    transaction instead of the request's session.
+    """
+    patch = req.model_dump(exclude={"lock_version", "merge"}, exclude_none=True)
+    if req.merge or not patch or not set(patch) <= set(versioned_info(model).columns):
+        return None
+    lock_version, actor = _expected_lock_version_from_request(), _active_user()
+    if group_commit.enabled:
+        result = group_commit.submit(
+            lambda session, batch: conditional_update(session, model, entity_id, lock_version, patch, actor, batch=batch)
+        )
+        if result is not None and result[0] == "updated":
+            db.session.info["committed"] = True
+    else:
+        result = conditional_update(db.session, model, entity_id, lock_version, patch, actor)
+    if result is None:
+        return None
+    status, row, snapshot = result
+    if status == "not_found":
+        db.session.rollback()
+        return jsonify(ErrorResponse(error=not_found).model_dump()), 404
+    if status == "conflict":
+        db.session.rollback()
+        return jsonify(ErrorResponse(error=CONFLICT_MSG).model_dump()), 409
+    if not group_commit.enabled:
+        db.session.commit()
+    entity = SimpleNamespace(**row, signal_ids=snapshot.get("signal_ids", []))
+    return jsonify(to_response(entity, updated=status == "updated"))
+
+
 def handle_optimistic_lock_error(exc):
     if request.path.startswith("/api/"):
         return jsonify(ErrorResponse(error=str(exc)).model_dump()), 409
@@ -101,7 +215,6 @@ def handle_optimistic_lock_error(exc):
     return redirect(url_for("index"))
 
 
-@app.errorhandler(StaleDataError)
 def handle_stale_data_error(exc):
     if request.path.startswith("/api/"):
         return jsonify(ErrorResponse(error=CONFLICT_MSG).model_dump()), 409
@@ -109,7 +222,10 @@ def handle_stale_data_error(exc):
     return redirect(url_for("index"))
 
 
-@app.errorhandler(ValidationError)
+def handle_group_commit_timeout(exc):
+    return jsonify(ErrorResponse(error=str(exc)).model_dump()), exc.status
+
+
 def handle_validation_error(exc):
     if request.path.startswith("/api/"):
         msg = exc.errors()[0].get("msg", "Validation error") if exc.errors() else "Validation error"
@@ -134,13 +250,31 @@ def _api_path_no_jwt():
 def require_jwt_for_api():
     if _api_path_no_jwt():
         return None
+    token = bearer_token()
+    jwt_cache.refresh(db.engine)
+    cached = jwt_cache.get(token) if token else None
+    if cached is not None:
+        install_verified_jwt(*cached)
+        return None
     try:
-        verify_jwt_in_request(optional=False)
+        verified = verify_jwt_in_request(optional=False)
     except Exception:
         return jsonify(ErrorResponse(error="Authorization required").model_dump()), 401
+    if token and verified is not None:
+        jwt_cache.put(token, *verified)
     return None
 
 
+@api_bp.before_request
+def route_reads_to_replica():
+    route_request(db.session)
+
+
+@api_bp.after_request
+def stick_to_primary_after_write(response):
+    return mark_sticky(db.session, response)
+
+
 @api_bp.route("/auth/login", methods=["POST"])
 def api_auth_login():
     """Login with username/password. Demo: test_user / test_pass."""
@@ -149,21 +283,43 @@ def api_auth_login():
         req = LoginRequest.model_validate(body)
     except ValidationError as e:
         return jsonify(ErrorResponse(error=e.errors()[0].get("msg", "Validation error")).model_dump()), 422
-    if req.username != app.config["DEMO_USERNAME"] or req.password != app.config["DEMO_PASSWORD"]:
+    if req.username != current_app.config["DEMO_USERNAME"] or req.password != current_app.config["DEMO_PASSWORD"]:
         return jsonify(ErrorResponse(error="Invalid username or password").model_dump()), 401
     token = create_access_token(identity=req.username)
     return jsonify(LoginResponse(access_token=token, user=req.username).model_dump()), 200
 
 
+@api_bp.route("/auth/logout", methods=["POST"])
+def api_auth_logout():
+    """Revoke the current token in every API process and drop it from the verification cache."""
+    claims = get_jwt()
+    jwt_cache.revoke_shared(db.session, claims.get("jti"), claims.get("exp"), token=bearer_token())
+    return jsonify({"ok": True}), 200
+
+
+@api_bp.route("/metrics", methods=["GET"])
+def api_metrics():
+    """Per-process counters of the in-memory caches."""
+    return jsonify({
+        "jwt_cache": jwt_cache.stats(),
+        "version_diffs": diff_cache.stats(),
+        "version_history": history_cache.stats(),
+        "checkpoint_trees": checkpoint_trees.stats(),
+        "read_coalescing": read_coalescing.stats(),
+        "group_commit": group_commit.stats(),
+    })
+
+
 @api_bp.route("/session", methods=["GET"])
 def api_session_get():
     return jsonify(SessionResponse(active_user=_active_user()).model_dump())
 
 
 @api_bp.route("/signals", methods=["GET"])
+@coalesced
 def api_signals_list():
     signals = Signal.query.filter_by(is_deleted=False).order_by(Signal.id.desc()).all()
-    return jsonify([signal_to_response(s) for s in signals])
+    return json_response(dump_list(SignalResponse, [signal_to_response(s) for s in signals]))
 
 
 @api_bp.route("/signals", methods=["POST"])
@@ -171,6 +327,11 @@ def api_signals_create():
     _set_actor()
     body = request.get_json(silent=True) or {}
     req = SignalCreateRequest.model_validate(body)
+    if group_commit.enabled:
+        values, actor = req.model_dump(), _active_user()
+        row = group_commit.submit(lambda session, batch: insert_entity(session, Signal, values, actor, batch))
+        db.session.info["committed"] = True
+        return jsonify(signal_to_response(SimpleNamespace(**row))), 201
     signal = Signal(
         frequency_from=req.frequency_from,
         frequency_to=req.frequency_to,
@@ -185,23 +346,25 @@ def api_signals_create():
 @api_bp.route("/signals/<int:signal_id>", methods=["PATCH"])
 def api_signals_update(signal_id):
     _set_actor()
+    body = request.get_json(silent=True) or {}
+    req = SignalUpdateRequest.model_validate(body)
+    response = _conditional_patch(Signal, signal_id, req, "Signal not found", signal_to_response)
+    if response is not None:
+        return response
     signal = Signal.query.filter_by(id=signal_id, is_deleted=False).first()
     if not signal:
         return jsonify(ErrorResponse(error="Signal not found").model_dump()), 404
-    conflict = _check_lock_version(signal, _expected_lock_version_from_request())
+    changes, conflict = _patch_changes(signal, req)
     if conflict is not None:
         return conflict
-    body = request.get_json(silent=True) or {}
-    req = SignalUpdateRequest.model_validate(body)
     previous_lock = signal.lock_version
-    if req.frequency_from is not None:
-        signal.frequency_from = req.frequency_from
-    if req.frequency_to is not None:
-        signal.frequency_to = req.frequency_to
-    if req.modulation is not None:
-        signal.modulation = req.modulation
-    if req.power is not None:
-        signal.power = req.power
+    for field, value in changes.items():
+        setattr(signal, field, value)
+    if req.merge and signal.frequency_to < signal.frequency_from:
+        # Each side kept a valid range, but the merged one is inverted.
+        response = _merge_conflict_response(signal, ["frequency_from", "frequency_to"])
+        db.session.rollback()
+        return response
     db.session.commit()
     updated = signal.lock_version != previous_lock
     return jsonify(signal_to_response(signal, updated=updated))
@@ -221,10 +384,77 @@ def api_signals_delete(signal_id):
     return jsonify({"ok": True}), 200
 
 
+def _bulk_items(req):
+    return {item.id: item.lock_version for item in req.items}
+
+
+def _bulk_update_response(model, req):
+    _set_actor()
+    values = req.model_dump(exclude={"items"}, exclude_none=True)
+    if not values:
+        return jsonify(ErrorResponse(error="No fields to update").model_dump()), 422
+    result = bulk_update(
+        db.session, model, _bulk_items(req), values, _active_user(),
+        chunk_size=current_app.config["BULK_CHUNK_SIZE"],
+    )
+    return json_response(dump_one(BulkResultResponse, result))
+
+
+def _bulk_delete_response(model, req):
+    _set_actor()
+    result = bulk_soft_delete(
+        db.session, model, _bulk_items(req), _active_user(),
+        chunk_size=current_app.config["BULK_CHUNK_SIZE"],
+    )
+    return json_response(dump_one(BulkResultResponse, result))
+
+
+@api_bp.route("/signals/bulk", methods=["PATCH"])
+def api_signals_bulk_update():
+    req = SignalBulkUpdateRequest.model_validate(request.get_json(silent=True) or {})
+    return _bulk_update_response(Signal, req)
+
+
+@api_bp.route("/signals/bulk-delete", methods=["POST"])
+def api_signals_bulk_delete():
+    req = BulkDeleteRequest.model_validate(request.get_json(silent=True) or {})
+    return _bulk_delete_response(Signal, req)
+
+
 @api_bp.route("/assets", methods=["GET"])
+@coalesced
 def api_assets_list():
-    assets = Asset.query.filter_by(is_deleted=False).order_by(Asset.id.desc()).all()
-    return jsonify([asset_to_response(a) for a in assets])
+    assets = (
+        Asset.query.filter_by(is_deleted=False)
+        .options(selectinload(Asset.signals))
+        .order_by(Asset.id.desc())
+        .all()
+    )
+    return json_response(dump_list(AssetResponse, [asset_to_response(a) for a in assets]))
+
+
+@api_bp.route("/assets/search", methods=["GET"])
+@coalesced
+def api_assets_search():
+    """Ranked full-text search over asset name and description (see search.py)."""
+    query = AssetSearchQuery.model_validate(request.args.to_dict())
+    hits = search_assets(db.session, query.q, limit=query.limit + 1, offset=query.offset)
+    has_more = len(hits) > query.limit
+    hits = hits[:query.limit]
+    assets = {
+        asset.id: asset
+        for asset in Asset.query.filter(Asset.id.in_([asset_id for asset_id, _ in hits]))
+        .options(selectinload(Asset.signals))
+    }
+    results = [
+        {**asset_to_response(assets[asset_id]), "score": score}
+        for asset_id, score in hits
+        if asset_id in assets
+    ]
+    return json_response(dump_one(AssetSearchResponse, {
+        "results": results,
+        "next_offset": query.offset + query.limit if has_more else None,
+    }))
 
 
 @api_bp.route("/assets", methods=["POST"])
@@ -246,26 +476,31 @@ def api_assets_create():
 @api_bp.route("/assets/<int:asset_id>", methods=["PATCH"])
 def api_assets_update(asset_id):
     _set_actor()
+    body = request.get_json(silent=True) or {}
+    req = AssetUpdateRequest.model_validate(body)
+    response = _conditional_patch(Asset, asset_id, req, "Asset not found", asset_to_response)
+    if response is not None:
+        return response
     asset = Asset.query.filter_by(id=asset_id, is_deleted=False).first()
     if not asset:
         return jsonify(ErrorResponse(error="Asset not found").model_dump()), 404
-    conflict = _check_lock_version(asset, _expected_lock_version_from_request())
+    changes, conflict = _patch_changes(asset, req)
     if conflict is not None:
         return conflict
-    body = request.get_json(silent=True) or {}
-    req = AssetUpdateRequest.model_validate(body)
     previous_lock = asset.lock_version
-    if req.name is not None:
-        asset.name = req.name
-    if req.description is not None:
-        asset.description = req.description
-    if req.signal_ids is not None:
+    if "signal_ids" in changes:
+        # Query before assigning columns: autoflush would otherwise write a separate version.
+        signal_ids = changes["signal_ids"]
         selected = (
-            Signal.query.filter(Signal.id.in_(req.signal_ids), Signal.is_deleted.is_(False)).all()
-            if req.signal_ids
+            Signal.query.filter(Signal.id.in_(signal_ids), Signal.is_deleted.is_(False)).all()
+            if signal_ids
             else []
         )
         asset.signals = selected
+    if "name" in changes:
+        asset.name = changes["name"]
+    if "description" in changes:
+        asset.description = changes["description"]
     db.session.commit()
     updated = asset.lock_version != previous_lock
     return jsonify(asset_to_response(asset, updated=updated))
@@ -285,21 +520,173 @@ def api_assets_delete(asset_id):
     return jsonify({"ok": True}), 200
 
 
+@api_bp.route("/assets/bulk", methods=["PATCH"])
+def api_assets_bulk_update():
+    req = AssetBulkUpdateRequest.model_validate(request.get_json(silent=True) or {})
+    return _bulk_update_response(Asset, req)
+
+
+@api_bp.route("/assets/bulk-delete", methods=["POST"])
+def api_assets_bulk_delete():
+    req = BulkDeleteRequest.model_validate(request.get_json(silent=True) or {})
+    return _bulk_delete_response(Asset, req)
+
+
+def _apply_membership(items, add=(), remove=()):
+    _set_actor()
+    return bulk_membership(
+        db.session, items, add, remove, _active_user(),
+        chunk_size=current_app.config["BULK_CHUNK_SIZE"],
+    )
+
+
+@api_bp.route("/assets/membership", methods=["POST"])
+def api_assets_membership():
+    """Add/remove signal links for many assets in one call (only the affected links are written)."""
+    req = AssetMembershipRequest.model_validate(request.get_json(silent=True) or {})
+    result = _apply_membership(_bulk_items(req), add=req.add, remove=req.remove)
+    return json_response(dump_one(BulkResultResponse, result))
+
+
+@api_bp.route("/assets/<int:asset_id>/signals", methods=["POST", "DELETE"])
+def api_asset_signals(asset_id):
+    """Link (POST) or unlink (DELETE) signals on one asset; returns the new lock_version only."""
+    req = AssetSignalsRequest.model_validate(request.get_json(silent=True) or {})
+    items = {asset_id: req.lock_version}
+    if request.method == "POST":
+        result = _apply_membership(items, add=req.signal_ids)
+    else:
+        result = _apply_membership(items, remove=req.signal_ids)
+    if result["not_found"]:
+        return jsonify(ErrorResponse(error="Asset not found").model_dump()), 404
+    if result["conflicts"]:
+        return jsonify(ErrorResponse(error=CONFLICT_MSG).model_dump()), 409
+    lock_version = db.session.query(Asset.lock_version).filter_by(id=asset_id).scalar()
+    return json_response(dump_one(AssetMembershipResponse, {
+        "id": asset_id, "lock_version": lock_version, "updated": bool(result["updated"]),
+    }))
+
+
 @api_bp.route("/changes", methods=["GET"])
+@coalesced
 def api_changes_list():
-    """List all versioning events (changes) for the history table."""
-    limit = request.args.get("limit", type=int, default=100)
-    offset = request.args.get("offset", type=int, default=0)
-    limit = min(max(1, limit), 500)
-    offset = max(0, offset)
-    versions = (
-        EntityVersion.query
-        .order_by(EntityVersion.changed_at.desc())
-        .limit(limit)
-        .offset(offset)
+    """List versioning events (changes) for the history table, newest first.
+
+    Filters: who, entity_type, operation, since/until (ISO datetimes). Pages are keyset-based:
+    pass the X-Next-Cursor response header back as `cursor` (`offset` still works but scans).
+    """
+    query = ChangesQuery.model_validate(request.args.to_dict())
+    changes = db.session.query(
+        EntityVersion.id,
+        EntityVersion.changed_at,
+        EntityVersion.changed_by,
+        EntityVersion.operation,
+        EntityVersion.entity_type,
+        EntityVersion.entity_id,
+        EntityVersion.summary,
+    )
+    if query.who:
+        changes = changes.filter(EntityVersion.changed_by == query.who)
+    if query.entity_type:
+        changes = changes.filter(EntityVersion.entity_type == query.entity_type)
+    if query.operation:
+        changes = changes.filter(EntityVersion.operation == query.operation)
+    if query.since:
+        changes = changes.filter(EntityVersion.changed_at >= query.since)
+    if query.until:
+        changes = changes.filter(EntityVersion.changed_at < query.until)
+    if query.cursor:
+        changed_at, row_id = query.cursor
+        changes = changes.filter(or_(
+            EntityVersion.changed_at < changed_at,
+            and_(EntityVersion.changed_at == changed_at, EntityVersion.id < row_id),
+        ))
+    elif query.offset:
+        changes = changes.offset(query.offset)
+    rows = (
+        changes
+        .order_by(EntityVersion.changed_at.desc(), EntityVersion.id.desc())
+        .limit(query.limit + 1)
+        .all()
+    )
+    has_more = len(rows) > query.limit
+    rows = rows[:query.limit]
+    # Rows from before `summary` was stored (until `flask history backfill-summaries` has run).
+    fallback = summaries_for(db.session, [row.id for row in rows if row.summary is None])
+    response = json_response(dump_list(
+        ChangeRecordResponse, [change_record_to_response(row, fallback.get(row.id)) for row in rows]
+    ))
+    if has_more:
+        response.headers["X-Next-Cursor"] = f"{rows[-1].changed_at.isoformat()},{rows[-1].id}"
+    return response
+
+
+ACTIVITY_DEFAULT_RANGE = {"hour": timedelta(days=1), "day": timedelta(days=30)}
+
+
+@api_bp.route("/activity", methods=["GET"])
+@coalesced
+def api_activity():
+    """Change counts per hour or day by entity type, operation and user, from activity_rollups."""
+    query = ActivityQuery.model_validate(request.args.to_dict())
+    until = query.until or datetime.utcnow()
+    since = query.since or until - ACTIVITY_DEFAULT_RANGE[query.bucket]
+    rollups = activity(
+        db.session, query.bucket, since, until,
+        entity_type=query.entity_type, operation=query.operation, who=query.who,
+    )
+    return json_response(dump_list(ActivityBucketResponse, [activity_to_response(r) for r in rollups]))
+
+
+@api_bp.route("/sync", methods=["GET"])
+def api_sync():
+    """Delta feed: entities created/updated since `since` plus tombstones for deleted ones.
+
+    The cursor is the last consumed `entity_versions.id`; the page is a range scan on the
+    primary key, so each call reads at most `limit` history rows regardless of table size.
+    Ids are assigned at insert, not at commit, so the page stops before the first row younger
+    than SYNC_SETTLE_SECONDS: a transaction still in flight may hold a lower id, and the
+    cursor must not move past it.
+    """
+    since = max(0, request.args.get("since", type=int, default=0))
+    limit = request.args.get("limit", type=int, default=SYNC_DEFAULT_LIMIT)
+    limit = min(max(1, limit), SYNC_MAX_LIMIT)
+    horizon = datetime.utcnow() - timedelta(seconds=current_app.config["SYNC_SETTLE_SECONDS"])
+    changes = (
+        db.session.query(EntityVersion.id, EntityVersion.entity_type, EntityVersion.entity_id, EntityVersion.changed_at)
+        .filter(EntityVersion.id > since)
+        .order_by(EntityVersion.id.asc())
+        .limit(limit + 1)
         .all()
     )
-    return jsonify([change_record_to_response(v) for v in versions])
+    settled = next((index for index, change in enumerate(changes) if change.changed_at > horizon), len(changes))
+    has_more = settled > limit
+    changes = changes[:min(settled, limit)]
+
+    changed_ids = {}
+    for change in changes:
+        changed_ids.setdefault(change.entity_type, set()).add(change.entity_id)
+
+    payload = {"signals": [], "assets": [], "tombstones": []}
+    for entity_type, ids in changed_ids.items():
+        model = versioned_model(entity_type)
+        if model is None:
+            continue
+        query = model.query.filter(model.id.in_(ids))
+        if model is Asset:
+            query = query.options(selectinload(Asset.signals))
+        found = {entity.id: entity for entity in query.all()}
+        to_response = signal_to_response if model is Signal else asset_to_response
+        for entity_id in sorted(ids):
+            entity = found.get(entity_id)
+            if entity is None or entity.is_deleted:
+                payload["tombstones"].append(tombstone_to_response(entity_type, entity_id, entity))
+            else:
+                payload[entity_type].append(to_response(entity))
+
+    payload["cursor"] = changes[-1].id if changes else since
+    payload["has_more"] = has_more
+    return json_response(dump_one(SyncResponse, payload))
 
 
 @api_bp.route("/trash", methods=["GET"])
@@ -322,40 +709,153 @@ def api_trash_list():
             "deleted_by": asset.deleted_by,
         })
     deleted_items.sort(key=lambda x: x["deleted_at"] or "", reverse=True)
-    return jsonify(deleted_items)
+    return json_response(dump_list(TrashItemResponse, deleted_items))
 
 
 @api_bp.route("/versions/<entity_type>/<int:entity_id>", methods=["GET"])
 def api_versions_list(entity_type, entity_id):
-    model = ENTITY_MODELS.get(entity_type)
+    model = versioned_model(entity_type)
     if model is None:
         return jsonify(ErrorResponse(error="Unknown entity type").model_dump()), 404
-    versions = (
-        EntityVersion.query
-        .filter_by(entity_type=model.__tablename__, entity_id=entity_id)
-        .order_by(EntityVersion.version.desc())
-        .all()
-    )
-    return jsonify([version_to_response(v) for v in versions])
+    body, etag = version_history(db.session, model.__tablename__, entity_id)
+    response = json_response(body)
+    # Clients revalidate and get 304 until a new version exists or the chain is backfilled.
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
+@api_bp.route("/versions/<entity_type>/<int:entity_id>/<int:version>", methods=["GET"])
+def api_version_detail(entity_type, entity_id, version):
+    """One history row; it never changes, so clients may cache it for good."""
+    model = versioned_model(entity_type)
+    if model is None:
+        return jsonify(ErrorResponse(error="Unknown entity type").model_dump()), 404
+    row = db.session.execute(select_versions(
+        EntityVersion.entity_type == model.__tablename__,
+        EntityVersion.entity_id == entity_id,
+        EntityVersion.version == version,
+    )).first()
+    if row is None:
+        return jsonify(ErrorResponse(error="Version not found").model_dump()), 404
+    response = json_response(dump_version(row))
+    response.set_etag(row.chain_hash or row.hash)
+    response.headers["Cache-Control"] = version_cache_control(row)
+    return response.make_conditional(request)
+
+
+@api_bp.route("/versions/<entity_type>/<int:entity_id>/diff", methods=["GET"])
+def api_versions_diff(entity_type, entity_id):
+    """Net diff between versions `from` and `to` (either order) of one entity."""
+    model = versioned_model(entity_type)
+    if model is None:
+        return jsonify(ErrorResponse(error="Unknown entity type").model_dump()), 404
+    from_version = request.args.get("from", type=int)
+    to_version = request.args.get("to", type=int)
+    if from_version is None or to_version is None or min(from_version, to_version) < 1:
+        return jsonify(ErrorResponse(error="from and to must be version numbers").model_dump()), 422
+    key = (model.__tablename__, entity_id, from_version, to_version)
+    body = diff_cache.get(key)
+    if body is None:
+        diff = version_diff(db.session, model.__tablename__, entity_id, from_version, to_version)
+        if diff is None:
+            return jsonify(ErrorResponse(error="Version not found").model_dump()), 404
+        body = dump_one(VersionDiffResponse, {
+            "entity_type": model.__tablename__,
+            "entity_id": entity_id,
+            "from_version": from_version,
+            "to_version": to_version,
+            "diff": diff,
+        })
+        diff_cache.set(key, body)
+    return json_response(body)
 
 
-app.register_blueprint(api_bp)
-api_spec.register(app)
+@api_bp.route("/versions/<entity_type>/<int:entity_id>/<int:version>/proof", methods=["GET"])
+def api_version_proof(entity_type, entity_id, version):
+    """Merkle inclusion proof of a version in the history checkpoint that covers it."""
+    model = versioned_model(entity_type)
+    if model is None:
+        return jsonify(ErrorResponse(error="Unknown entity type").model_dump()), 404
+    row = EntityVersion.query.filter_by(
+        entity_type=model.__tablename__, entity_id=entity_id, version=version
+    ).first()
+    if row is None:
+        return jsonify(ErrorResponse(error="Version not found").model_dump()), 404
+    checkpoint = HistoryCheckpoint.query.filter(
+        HistoryCheckpoint.first_id <= row.id, HistoryCheckpoint.last_id >= row.id
+    ).first()
+    if checkpoint is None:
+        return jsonify(ErrorResponse(error="Version is not covered by a checkpoint yet").model_dump()), 404
+    positions, levels = checkpoint_tree(db.session, checkpoint)
+    index = positions[row.id]
+    return json_response(dump_one(VersionProofResponse, {
+        "entity_type": row.entity_type,
+        "entity_id": row.entity_id,
+        "version": row.version,
+        "version_id": row.id,
+        "chain_hash": row.chain_hash,
+        "leaf": levels[0][index],
+        "index": index,
+        "path": proof_from_levels(levels, index),
+        "checkpoint": {
+            "id": checkpoint.id,
+            "first_id": checkpoint.first_id,
+            "last_id": checkpoint.last_id,
+            "leaf_count": checkpoint.leaf_count,
+            "root": checkpoint.root,
+        },
+    }))
 
 
-@app.route("/")
 def index():
-    return send_from_directory(app.static_folder, "index.html")
+    return send_from_directory(current_app.static_folder, "index.html")
 
 
-@app.route("/<path:path>")
 def spa_fallback(path):
     if path.startswith("api/"):
         return jsonify(ErrorResponse(error="Not found").model_dump()), 404
-    return send_from_directory(app.static_folder, "index.html")
+    return send_from_directory(current_app.static_folder, "index.html")
+
+
+def create_app(config=Config):
+    """Build the Flask app. Engines are created here, so each worker process must call it after fork."""
+    app = Flask(__name__, static_folder=str(STATIC_FOLDER), static_url_path="/static")
+    app.config.from_object(config)
+    init_json_provider(app)
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    jwt.init_app(app)
+    jwt_cache.init_app(app)
+    read_coalescing.init_app(app)
+    group_commit.init_app(app)
+    diff_cache.maxsize = app.config["VERSION_DIFF_CACHE_SIZE"]
+    history_cache.maxsize = app.config["VERSION_HISTORY_CACHE_SIZE"]
+    history_cache.maxbytes = app.config["VERSION_HISTORY_CACHE_BYTES"]
+    checkpoint_trees.maxsize = app.config["HISTORY_PROOF_CACHE_SIZE"]
+
+    app.register_error_handler(OptimisticLockError, handle_optimistic_lock_error)
+    app.register_error_handler(StaleDataError, handle_stale_data_error)
+    app.register_error_handler(ValidationError, handle_validation_error)
+    app.register_error_handler(GroupCommitTimeout, handle_group_commit_timeout)
+
+    app.register_blueprint(api_bp)
+    api_spec.register(app)
+
+    app.cli.add_command(trash_cli)
+    app.cli.add_command(audit_cli)
+    app.cli.add_command(history_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(replica_cli)
+
+    app.add_url_rule("/", "index", index)
+    app.add_url_rule("/<path:path>", "spa_fallback", spa_fallback)
+    return app
 
 
 if __name__ == "__main__":
     host = os.environ.get("FLASK_HOST", "127.0.0.1")
     port = int(os.environ.get("FLASK_PORT", "8000"))
-    app.run(host=host, port=port, debug=True)
+    create_app().run(host=host, port=port, debug=True)
@@ -0,0 +1,338 @@
+"""Read-only asyncio API for history browsing, served next to the Flask app.
+
+    ASYNC_WORKERS=2 python app/serve_async.py        # uvicorn on ASYNC_BIND (127.0.0.1:8001)
+
+Routes, with the same query parameters, status codes and JSON bodies as the Flask app:
+
+    GET /api/signals
+    GET /api/assets
+    GET /api/changes
+    GET /api/versions/<entity_type>/<entity_id>
+    GET /api/versions/<entity_type>/<entity_id>/<version>
+    GET /api/versions/<entity_type>/<entity_id>/diff
+
+A Starlette app on an async SQLAlchemy engine (`ASYNC_DATABASE_URL`; derived from
+`DATABASE_URL` with the aiomysql / aiosqlite driver). While a query waits on the database the
+event loop serves other requests, so one process holds as many concurrent readers as its
+pool has connections (`ASYNC_DB_POOL_SIZE`), instead of one per thread. Writes, login and
+logout stay on the Flask app; route `GET /api/{signals,assets,changes,versions}` here at the
+proxy.
+
+Tokens are the ones issued by the Flask app (same `JWT_SECRET_KEY`), verified with PyJWT and
+cached like `jwt_cache`. Logouts on the Flask app are read from the `revoked_tokens` table
+(on the primary) at most every `JWT_REVOCATION_REFRESH` seconds, so a revoked token is
+rejected here too. With `REPLICA_DATABASE_URL` set, reads go to the
+replica unless the client wrote recently (`read_primary` cookie or `X-Last-Write` header, see
+replicas.py).
+"""
+import contextlib
+
+import jwt as pyjwt
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from config import Config
+from history import (
+    cache_history,
+    current_history,
+    diff_cache,
+    dump_version,
+    extend_history,
+    history_cache,
+    history_etag,
+    history_rows,
+    newest_version,
+    select_versions,
+    version_cache_control,
+)
+from jwt_cache import VerifiedTokenCache
+from models import Asset, EntityVersion, Signal, _change_summary, _diff_snapshots, versioned_model
+from replicas import wrote_recently
+from schemas import (
+    AssetResponse,
+    ChangeRecordResponse,
+    ChangesQuery,
+    ErrorResponse,
+    SignalResponse,
+    VersionDiffResponse,
+    asset_to_response,
+    change_record_to_response,
+    signal_to_response,
+)
+from serializers import dump_list, dump_one, join_list
+
+
+def _json(body, status=200, headers=None):
+    return Response(body + b"\n", status_code=status, headers=headers, media_type="application/json")
+
+
+def _error(message, status):
+    return _json(ErrorResponse(error=message).model_dump_json().encode(), status=status)
+
+
+def _conditional(request, body, etag, cache_control):
+    """Like werkzeug's `make_conditional`: 304 when If-None-Match carries the ETag."""
+    etag = f'"{etag}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return _json(body, headers=headers)
+
+
+def _session(request):
+    state = request.app.state
+    if state.replica_sessions is not None and not wrote_recently(
+        request.cookies, request.headers, state.sticky_seconds
+    ):
+        return state.replica_sessions()
+    return state.sessions()
+
+
+async def api_signals_list(request):
+    async with _session(request) as session:
+        signals = (await session.scalars(
+            select(Signal).where(Signal.is_deleted.is_(False)).order_by(Signal.id.desc())
+        )).all()
+        return _json(dump_list(SignalResponse, [signal_to_response(s) for s in signals]))
+
+
+async def api_assets_list(request):
+    async with _session(request) as session:
+        assets = (await session.scalars(
+            select(Asset)
+            .where(Asset.is_deleted.is_(False))
+            .options(selectinload(Asset.signals))
+            .order_by(Asset.id.desc())
+        )).all()
+        return _json(dump_list(AssetResponse, [asset_to_response(a) for a in assets]))
+
+
+async def api_changes_list(request):
+    """Same filters and keyset paging as the Flask `/api/changes`."""
+    query = ChangesQuery.model_validate(dict(request.query_params))
+    changes = select(
+        EntityVersion.id,
+        EntityVersion.changed_at,
+        EntityVersion.changed_by,
+        EntityVersion.operation,
+        EntityVersion.entity_type,
+        EntityVersion.entity_id,
+        EntityVersion.summary,
+    )
+    if query.who:
+        changes = changes.where(EntityVersion.changed_by == query.who)
+    if query.entity_type:
+        changes = changes.where(EntityVersion.entity_type == query.entity_type)
+    if query.operation:
+        changes = changes.where(EntityVersion.operation == query.operation)
+    if query.since:
+        changes = changes.where(EntityVersion.changed_at >= query.since)
+    if query.until:
+        changes = changes.where(EntityVersion.changed_at < query.until)
+    if query.cursor:
+        changed_at, row_id = query.cursor
+        changes = changes.where(or_(
+            EntityVersion.changed_at < changed_at,
+            and_(EntityVersion.changed_at == changed_at, EntityVersion.id < row_id),
+        ))
+    elif query.offset:
+        changes = changes.offset(query.offset)
+    changes = changes.order_by(EntityVersion.changed_at.desc(), EntityVersion.id.desc()).limit(query.limit + 1)
+
+    async with _session(request) as session:
+        rows = (await session.execute(changes)).all()
+        has_more = len(rows) > query.limit
+        rows = rows[:query.limit]
+        missing = [row.id for row in rows if row.summary is None]
+        fallback = {}
+        if missing:
+            fallback = {
+                row.id: _change_summary(row.operation, row.snapshot, row.diff)
+                for row in await session.execute(
+                    select(EntityVersion.id, EntityVersion.operation, EntityVersion.snapshot, EntityVersion.diff)
+                    .where(EntityVersion.id.in_(missing))
+                )
+            }
+    headers = {"X-Next-Cursor": f"{rows[-1].changed_at.isoformat()},{rows[-1].id}"} if has_more else None
+    return _json(dump_list(
+        ChangeRecordResponse, [change_record_to_response(row, fallback.get(row.id)) for row in rows]
+    ), headers=headers)
+
+
+def _entity_type(request):
+    model = versioned_model(request.path_params["entity_type"])
+    return model.__tablename__ if model is not None else None
+
+
+async def api_versions_list(request):
+    """Version list through the same `history_cache` as `history.version_history`."""
+    entity_type = _entity_type(request)
+    if entity_type is None:
+        return _error("Unknown entity type", 404)
+    entity_id = request.path_params["entity_id"]
+    key = (entity_type, entity_id)
+    cached = history_cache.get(key)
+    async with _session(request) as session:
+        history = current_history(cached, (await session.execute(newest_version(entity_type, entity_id))).first())
+        if history is None:
+            rows = (await session.execute(history_rows(entity_type, entity_id, cached))).all()
+            history = extend_history(cached, rows)
+            if history is None:
+                history = extend_history(None, (await session.execute(history_rows(entity_type, entity_id, None))).all())
+            cache_history(key, history)
+    body = join_list(history[2])
+    return _conditional(request, body, history_etag(entity_type, entity_id, history), "private, no-cache")
+
+
+async def api_version_detail(request):
+    entity_type = _entity_type(request)
+    if entity_type is None:
+        return _error("Unknown entity type", 404)
+    async with _session(request) as session:
+        row = (await session.execute(select_versions(
+            EntityVersion.entity_type == entity_type,
+            EntityVersion.entity_id == request.path_params["entity_id"],
+            EntityVersion.version == request.path_params["version"],
+        ))).first()
+        if row is None:
+            return _error("Version not found", 404)
+        body = dump_version(row)
+    return _conditional(request, body, row.chain_hash or row.hash, version_cache_control(row))
+
+
+def _int_arg(value):
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def api_versions_diff(request):
+    entity_type = _entity_type(request)
+    if entity_type is None:
+        return _error("Unknown entity type", 404)
+    entity_id = request.path_params["entity_id"]
+    from_version = _int_arg(request.query_params.get("from"))
+    to_version = _int_arg(request.query_params.get("to"))
+    if from_version is None or to_version is None or min(from_version, to_version) < 1:
+        return _error("from and to must be version numbers", 422)
+    key = (entity_type, entity_id, from_version, to_version)
+    body = diff_cache.get(key)
+    if body is None:
+        async with _session(request) as session:
+            rows = dict((await session.execute(
+                select(EntityVersion.version, EntityVersion.snapshot).where(
+                    EntityVersion.entity_type == entity_type,
+                    EntityVersion.entity_id == entity_id,
+                    EntityVersion.version.in_(sorted({from_version, to_version})),
+                )
+            )).all())
+        if from_version not in rows or to_version not in rows:
+            return _error("Version not found", 404)
+        body = dump_one(VersionDiffResponse, {
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "from_version": from_version,
+            "to_version": to_version,
+            "diff": _diff_snapshots(rows[from_version] or {}, rows[to_version] or {}),
+        })
+        diff_cache.set(key, body)
+    return _json(body)
+
+
+class JWTMiddleware:
+    """Pure ASGI middleware: 401 unless the request carries a valid access token."""
+
+    def __init__(self, app, secret, algorithm, cache, sessions):
+        self.app = app
+        self.secret = secret
+        self.algorithm = algorithm
+        self.cache = cache
+        self.sessions = sessions
+
+    async def _refresh_revocations(self):
+        if not self.cache.revocations_due():
+            return
+        async with self.sessions() as session:
+            rows = (await session.execute(self.cache.revocations_query())).all()
+        self.cache.apply_revocations(rows)
+
+    def _verify(self, token):
+        cached = self.cache.get(token)
+        if cached is not None:
+            return cached
+        try:
+            header = pyjwt.get_unverified_header(token)
+            claims = pyjwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except pyjwt.PyJWTError:
+            return None
+        if claims.get("type") != "access" or self.cache.is_revoked(claims.get("jti")):
+            return None
+        self.cache.put(token, header, claims)
+        return header, claims
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scheme, _, token = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1").partition(" ")
+            await self._refresh_revocations()
+            if scheme != "Bearer" or not token or self._verify(token) is None:
+                response = _error("Authorization required", 401)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+async def _validation_error(request, exc):
+    msg = exc.errors()[0].get("msg", "Validation error") if exc.errors() else "Validation error"
+    return _error(msg, 422)
+
+
+def _engine(url, config):
+    options = {"pool_pre_ping": True, "pool_recycle": config.DB_POOL_RECYCLE}
+    if not url.startswith("sqlite"):
+        options.update(pool_size=config.ASYNC_DB_POOL_SIZE, max_overflow=config.DB_MAX_OVERFLOW)
+    return create_async_engine(url, **options)
+
+
+def create_async_app(config=Config):
+    """Starlette app for the read-only routes; engines are created here and disposed on shutdown."""
+    engines = [_engine(config.ASYNC_DATABASE_URL, config)]
+    if config.ASYNC_REPLICA_DATABASE_URL:
+        engines.append(_engine(config.ASYNC_REPLICA_DATABASE_URL, config))
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        for engine in engines:
+            await engine.dispose()
+
+    app = Starlette(
+        routes=[
+            Route("/api/signals", api_signals_list, methods=["GET"]),
+            Route("/api/assets", api_assets_list, methods=["GET"]),
+            Route("/api/changes", api_changes_list, methods=["GET"]),
+            Route("/api/versions/{entity_type}/{entity_id:int}", api_versions_list, methods=["GET"]),
+            Route("/api/versions/{entity_type}/{entity_id:int}/diff", api_versions_diff, methods=["GET"]),
+            Route("/api/versions/{entity_type}/{entity_id:int}/{version:int}", api_version_detail, methods=["GET"]),
+        ],
+        exception_handlers={ValidationError: _validation_error},
+        lifespan=lifespan,
+    )
+    app.state.sessions = async_sessionmaker(engines[0], expire_on_commit=False)
+    app.state.replica_sessions = async_sessionmaker(engines[1], expire_on_commit=False) if len(engines) > 1 else None
+    app.state.sticky_seconds = config.REPLICA_STICKY_SECONDS
+    history_cache.maxsize = config.VERSION_HISTORY_CACHE_SIZE
+    history_cache.maxbytes = config.VERSION_HISTORY_CACHE_BYTES
+    cache = VerifiedTokenCache(
+        maxsize=config.JWT_CACHE_SIZE, ttl=config.JWT_CACHE_TTL, refresh_interval=config.JWT_REVOCATION_REFRESH
+    )
+    app.add_middleware(
+        JWTMiddleware, secret=config.JWT_SECRET_KEY, algorithm=config.JWT_ALGORITHM, cache=cache,
+        sessions=app.state.sessions,
+    )
+    return app
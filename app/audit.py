@@ -0,0 +1,381 @@
+"""Integrity audit of the history table.
+
+    flask --app app/app.py audit verify --workers 4 --checkpoint audit.json
+    flask --app app/app.py audit verify --entity-type assets --since 2026-01-01 --until 2026-02-01
+    flask --app app/app.py audit verify --checkpoint audit.json --resume
+    flask --app app/app.py audit verify --incremental
+    flask --app app/app.py audit backfill-chain
+    flask --app app/app.py audit checkpoint
+    flask --app app/app.py audit verify-checkpoints
+
+`entity_versions` is streamed in id order through a server-side cursor, batches are rehashed
+with `_calculate_hash` in a process pool, and each row's `chain_hash` is recomputed from its
+predecessor's, so edited, deleted or reordered rows are reported. After the scan a grouped
+query reports entities with duplicate or missing version numbers. With `--checkpoint` the
+last verified id is saved after every batch, so `--resume` continues where a previous run
+stopped.
+
+`checkpoint` stores Merkle roots over fixed-size id ranges (`history_checkpoints`).
+`verify-checkpoints` recomputes them, and `verify --incremental` only rehashes rows newer
+than the last checkpoint.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import json
+import os
+from pathlib import Path
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, distinct, func, select, update
+from sqlalchemy.orm import aliased
+
+from caching import BoundedCache
+from merkle import leaf_hash, merkle_levels, merkle_root
+from models import EntityVersion, HistoryCheckpoint, _calculate_hash, _chain_hash, db
+
+AUDIT_BATCH_SIZE = 2000
+
+# Merkle trees of checkpoints for inclusion proofs: checkpoint id -> ({row id: leaf index},
+# levels). Checkpoints never change, so entries need no expiry; the size comes from
+# HISTORY_PROOF_CACHE_SIZE.
+checkpoint_trees = BoundedCache(32)
+
+
+def _verify_batch(rows):
+    """Return [(id, entity_type, entity_id, version, problem)] for rows failing the hash or chain check."""
+    problems = []
+    for row_id, entity_type, entity_id, version, snapshot, stored_hash, chain_hash, previous_chain_hash in rows:
+        snapshot_hash = _calculate_hash(snapshot)
+        if snapshot_hash != stored_hash:
+            problems.append((row_id, entity_type, entity_id, version, "hash"))
+        elif chain_hash is not None and _chain_hash(previous_chain_hash, snapshot_hash) != chain_hash:
+            problems.append((row_id, entity_type, entity_id, version, "chain"))
+    return problems
+
+
+def _filters(entity_type, since, until):
+    conditions = []
+    if entity_type:
+        conditions.append(EntityVersion.entity_type == entity_type)
+    if since:
+        conditions.append(EntityVersion.changed_at >= since)
+    if until:
+        conditions.append(EntityVersion.changed_at < until)
+    return conditions
+
+
+def _stream_batches(session, conditions, after_id, batch_size):
+    previous = aliased(EntityVersion)
+    result = session.execute(
+        select(
+            EntityVersion.id,
+            EntityVersion.entity_type,
+            EntityVersion.entity_id,
+            EntityVersion.version,
+            EntityVersion.snapshot,
+            EntityVersion.hash,
+            EntityVersion.chain_hash,
+            previous.chain_hash,
+        )
+        .outerjoin(
+            previous,
+            (previous.entity_type == EntityVersion.entity_type)
+            & (previous.entity_id == EntityVersion.entity_id)
+            & (previous.version == EntityVersion.version - 1),
+        )
+        .where(EntityVersion.id > after_id, *conditions)
+        .order_by(EntityVersion.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+def _sequence_problems(session, conditions):
+    """Entities whose versions are not exactly 1..n: (entity_type, entity_id, rows, distinct, min, max)."""
+    rows = func.count(EntityVersion.id)
+    distinct_versions = func.count(distinct(EntityVersion.version))
+    query = (
+        select(
+            EntityVersion.entity_type,
+            EntityVersion.entity_id,
+            rows,
+            distinct_versions,
+            func.min(EntityVersion.version),
+            func.max(EntityVersion.version),
+        )
+        .group_by(EntityVersion.entity_type, EntityVersion.entity_id)
+        .having(
+            (rows != distinct_versions)
+            | (func.min(EntityVersion.version) != 1)
+            | (func.max(EntityVersion.version) != distinct_versions)
+        )
+    )
+    if conditions:
+        touched = select(EntityVersion.entity_type, EntityVersion.entity_id).where(*conditions).distinct().subquery()
+        query = query.join(
+            touched,
+            (EntityVersion.entity_type == touched.c.entity_type) & (EntityVersion.entity_id == touched.c.entity_id),
+        )
+    return session.execute(query).all()
+
+
+def _read_checkpoint(path):
+    if path and Path(path).exists():
+        return json.loads(Path(path).read_text()).get("last_id", 0)
+    return 0
+
+
+def _write_checkpoint(path, last_id):
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps({"last_id": last_id, "updated_at": datetime.utcnow().isoformat()}))
+    os.replace(tmp, path)
+
+
+def verify_history(session, entity_type=None, since=None, until=None, workers=None, batch_size=AUDIT_BATCH_SIZE,
+                   after_id=0, checkpoint=None, check_sequences=True, sequences_after_id=0, log=None):
+    """Rehash history rows, check hash chains and version sequences; returns a report dict.
+
+    The sequence check covers every entity matching the filters, or only entities with rows
+    after `sequences_after_id` when it is set (incremental audits).
+    """
+    conditions = _filters(entity_type, since, until)
+    workers = os.cpu_count() if workers is None else workers
+    report = {"rows": 0, "mismatches": [], "sequence_problems": [], "last_id": after_id}
+    started = time.perf_counter()
+
+    def consume(batch, mismatches):
+        report["rows"] += len(batch)
+        report["mismatches"].extend(mismatches)
+        report["last_id"] = batch[-1][0]
+        if checkpoint:
+            _write_checkpoint(checkpoint, report["last_id"])
+        if log:
+            elapsed = time.perf_counter() - started
+            log(f"verified {report['rows']} rows up to id {report['last_id']} ({report['rows'] / elapsed:.0f} rows/s)")
+
+    batches = _stream_batches(session, conditions, after_id, batch_size)
+    if workers <= 1:
+        for batch in batches:
+            consume(batch, _verify_batch(batch))
+    else:
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch in batches:
+                in_flight.append((batch, pool.submit(_verify_batch, batch)))
+                if len(in_flight) >= workers * 2:
+                    done_batch, future = in_flight.popleft()
+                    consume(done_batch, future.result())
+            while in_flight:
+                done_batch, future = in_flight.popleft()
+                consume(done_batch, future.result())
+
+    if check_sequences:
+        sequence_conditions = conditions + ([EntityVersion.id > sequences_after_id] if sequences_after_id else [])
+        report["sequence_problems"] = _sequence_problems(session, sequence_conditions)
+    report["elapsed"] = time.perf_counter() - started
+    return report
+
+
+def last_checkpoint(session):
+    return session.query(HistoryCheckpoint).order_by(HistoryCheckpoint.last_id.desc()).first()
+
+
+def _leaf_rows(session, first_id, last_id=None, limit=None):
+    query = (
+        select(
+            EntityVersion.id,
+            EntityVersion.entity_type,
+            EntityVersion.entity_id,
+            EntityVersion.version,
+            EntityVersion.chain_hash,
+            EntityVersion.changed_at,
+        )
+        .where(EntityVersion.id >= first_id)
+        .order_by(EntityVersion.id)
+    )
+    if last_id is not None:
+        query = query.where(EntityVersion.id <= last_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return session.execute(query).all()
+
+
+def _leaves(rows):
+    return [leaf_hash(row.id, row.entity_type, row.entity_id, row.version, row.chain_hash) for row in rows]
+
+
+def checkpoint_leaves(session, checkpoint):
+    """(row ids, leaf hashes) of the range covered by `checkpoint`."""
+    rows = _leaf_rows(session, checkpoint.first_id, checkpoint.last_id)
+    return [row.id for row in rows], _leaves(rows)
+
+
+def checkpoint_tree(session, checkpoint):
+    """({row id: leaf index}, tree levels) of `checkpoint`, built once per process.
+
+    A tree whose root does not match the stored one (edited history) is returned but not
+    cached, so a proof never outlives a repair of the rows.
+    """
+    cached = checkpoint_trees.get(checkpoint.id)
+    if cached is not None:
+        return cached
+    ids, leaves = checkpoint_leaves(session, checkpoint)
+    levels = merkle_levels(leaves)
+    tree = {row_id: index for index, row_id in enumerate(ids)}, levels
+    if levels[-1][:1] == [checkpoint.root]:
+        checkpoint_trees.set(checkpoint.id, tree)
+    return tree
+
+
+def build_checkpoints(session, size, min_age=60, log=None):
+    """Add checkpoints over full ranges of `size` rows after the last checkpoint; returns how many.
+
+    Rows younger than `min_age` seconds are left for a later run so that transactions still in
+    flight (which may hold lower ids) are not skipped.
+    """
+    previous = last_checkpoint(session)
+    after_id = previous.last_id if previous else 0
+    horizon = datetime.utcnow() - timedelta(seconds=min_age)
+    created = 0
+    while True:
+        rows = _leaf_rows(session, after_id + 1, limit=size)
+        if len(rows) < size or rows[-1].changed_at > horizon:
+            break
+        if any(row.chain_hash is None for row in rows):
+            raise click.ClickException("rows without chain_hash found; run `audit backfill-chain` first")
+        checkpoint = HistoryCheckpoint(
+            first_id=rows[0].id, last_id=rows[-1].id, leaf_count=len(rows), root=merkle_root(_leaves(rows)),
+        )
+        session.add(checkpoint)
+        session.commit()
+        created += 1
+        after_id = checkpoint.last_id
+        if log:
+            log(f"checkpoint {checkpoint.id}: rows {checkpoint.first_id}..{checkpoint.last_id} root {checkpoint.root}")
+    return created
+
+
+def backfill_chain(session, batch_size=500, log=None):
+    """Compute chain_hash for entities that still have rows without one; returns rows updated."""
+    pending = (
+        session.query(EntityVersion.entity_type, EntityVersion.entity_id)
+        .filter(EntityVersion.chain_hash.is_(None))
+        .distinct()
+        .all()
+    )
+    statement = (
+        update(EntityVersion.__table__)
+        .where(EntityVersion.__table__.c.id == bindparam("row_id"))
+        .values(chain_hash=bindparam("new_chain_hash"))
+    )
+    updated = 0
+    for start in range(0, len(pending), batch_size):
+        changes = []
+        for entity_type, entity_id in pending[start:start + batch_size]:
+            rows = (
+                session.query(EntityVersion.id, EntityVersion.hash, EntityVersion.chain_hash)
+                .filter_by(entity_type=entity_type, entity_id=entity_id)
+                .order_by(EntityVersion.version)
+                .all()
+            )
+            chain_hash = None
+            for row in rows:
+                chain_hash = _chain_hash(chain_hash, row.hash)
+                if row.chain_hash != chain_hash:
+                    changes.append({"row_id": row.id, "new_chain_hash": chain_hash})
+        if changes:
+            session.execute(statement, changes)
+        session.commit()
+        updated += len(changes)
+        if log:
+            log(f"chained {min(start + batch_size, len(pending))}/{len(pending)} entities, {updated} rows updated")
+    return updated
+
+
+audit_cli = AppGroup("audit", help="History integrity audit commands.")
+
+
+@audit_cli.command("verify")
+@click.option("--entity-type", default=None, help="Only audit this entity type (e.g. signals).")
+@click.option("--since", type=click.DateTime(), default=None, help="Only rows changed at or after this time (UTC).")
+@click.option("--until", type=click.DateTime(), default=None, help="Only rows changed before this time (UTC).")
+@click.option("--workers", type=int, default=None, help="Hashing processes (default: CPU count; 1 = in-process).")
+@click.option("--batch-size", type=int, default=AUDIT_BATCH_SIZE, show_default=True, help="Rows per hashing task.")
+@click.option("--checkpoint", type=click.Path(dir_okay=False), default=None, help="File storing the last verified id.")
+@click.option("--resume", is_flag=True, help="Start after the id stored in --checkpoint.")
+@click.option("--incremental", is_flag=True, help="Only rows after the last Merkle checkpoint.")
+@click.option("--skip-sequence-check", is_flag=True, help="Do not check for duplicate/missing version numbers.")
+def verify_command(entity_type, since, until, workers, batch_size, checkpoint, resume, incremental,
+                   skip_sequence_check):
+    """Recompute snapshot and chain hashes and check per-entity version sequences."""
+    after_id = _read_checkpoint(checkpoint) if resume else 0
+    sequences_after_id = 0
+    if incremental:
+        covered = last_checkpoint(db.session)
+        sequences_after_id = covered.last_id if covered else 0
+        after_id = max(after_id, sequences_after_id)
+    report = verify_history(
+        db.session, entity_type=entity_type, since=since, until=until, workers=workers,
+        batch_size=batch_size, after_id=after_id, checkpoint=checkpoint,
+        check_sequences=not skip_sequence_check, sequences_after_id=sequences_after_id, log=click.echo,
+    )
+    for row_id, row_type, entity_id, version, problem in report["mismatches"]:
+        click.echo(f"{problem} mismatch: {row_type}#{entity_id} version {version} (row {row_id})")
+    for row_type, entity_id, rows, distinct_versions, min_version, max_version in report["sequence_problems"]:
+        problems = []
+        if rows != distinct_versions:
+            problems.append(f"{rows - distinct_versions} duplicate")
+        if min_version != 1 or max_version != distinct_versions:
+            problems.append(f"missing (have {distinct_versions} of 1..{max_version})")
+        click.echo(f"version sequence: {row_type}#{entity_id} {', '.join(problems)}")
+    rate = report["rows"] / report["elapsed"] if report["elapsed"] else 0
+    click.echo(
+        f"{report['rows']} rows in {report['elapsed']:.1f}s ({rate:.0f} rows/s), "
+        f"{len(report['mismatches'])} hash/chain mismatches, {len(report['sequence_problems'])} sequence problems, "
+        f"last id {report['last_id']}"
+    )
+    if report["mismatches"] or report["sequence_problems"]:
+        raise SystemExit(1)
+
+
+@audit_cli.command("backfill-chain")
+@click.option("--batch-size", type=int, default=500, show_default=True, help="Entities per transaction.")
+def backfill_chain_command(batch_size):
+    """Fill chain_hash for history rows written before hash chaining."""
+    updated = backfill_chain(db.session, batch_size=batch_size, log=click.echo)
+    click.echo(f"{updated} rows updated")
+
+
+@audit_cli.command("checkpoint")
+@click.option("--size", type=int, default=None, help="Rows per checkpoint (default HISTORY_CHECKPOINT_SIZE).")
+@click.option("--min-age", type=int, default=60, show_default=True, help="Leave rows younger than this (seconds).")
+def checkpoint_command(size, min_age):
+    """Store Merkle roots for complete ranges of history rows after the last checkpoint."""
+    size = size or current_app.config["HISTORY_CHECKPOINT_SIZE"]
+    created = build_checkpoints(db.session, size, min_age=min_age, log=click.echo)
+    click.echo(f"{created} checkpoints created")
+
+
+@audit_cli.command("verify-checkpoints")
+@click.option("--last", "last_n", type=int, default=None, help="Only the N most recent checkpoints.")
+def verify_checkpoints_command(last_n):
+    """Recompute stored Merkle roots; any edited, deleted or inserted row in a range changes its root."""
+    query = db.session.query(HistoryCheckpoint).order_by(HistoryCheckpoint.last_id.desc())
+    if last_n:
+        query = query.limit(last_n)
+    failures = 0
+    checked = 0
+    for checkpoint in query:
+        _, leaves = checkpoint_leaves(db.session, checkpoint)
+        checked += 1
+        if len(leaves) != checkpoint.leaf_count or merkle_root(leaves) != checkpoint.root:
+            failures += 1
+            click.echo(f"checkpoint {checkpoint.id} (rows {checkpoint.first_id}..{checkpoint.last_id}) does not match")
+    click.echo(f"{checked} checkpoints verified, {failures} mismatches")
+    if failures:
+        raise SystemExit(1)
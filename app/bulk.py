@@ -0,0 +1,351 @@
+"""Set-based bulk update and soft delete that keep optimistic locking and history.
+
+Rows are processed in chunks of `chunk_size` ids, one short transaction per chunk:
+
+1. lock the chunk (`SELECT ... FOR UPDATE`) and compare each row's `lock_version` with the
+   version the client sent;
+2. per expected version, one `UPDATE ... WHERE id IN (...) AND lock_version = :v` that
+   also bumps `lock_version`, `updated_at` and `updated_by`;
+3. one grouped query for the previous history rows and one multi-row INSERT of the new
+   `EntityVersion` rows.
+
+Chunks commit independently, so a large request is not atomic as a whole; the result
+lists which ids were updated, unchanged, conflicting or missing.
+
+`conditional_update` is the single-row PATCH fast path: one `UPDATE ... WHERE id = :id AND
+lock_version = :v AND NOT is_deleted` (RETURNING the row where the dialect supports it),
+without loading the entity first.
+
+`bulk_membership` adds and removes `asset_signals` links for many assets at once the same
+way. It touches only the affected link rows (one multi-row INSERT, one DELETE per chunk) and
+records history rows whose diff holds just the delta: `{"signal_ids": {"added", "removed"}}`.
+"""
+from datetime import datetime
+
+from sqlalchemy import Integer, delete, insert, or_, select, update
+
+from models import (
+    Asset,
+    Signal,
+    VersionBatch,
+    asset_signals,
+    _diff_snapshots,
+    _insert_versions,
+    _json_value,
+    _latest_versions,
+    _serialize_row,
+    _version_values,
+)
+
+BULK_CHUNK_SIZE = 500
+
+
+def _empty_result():
+    return {"updated": [], "unchanged": [], "conflicts": [], "not_found": []}
+
+
+def _update_chunk(session, model, chunk, items, values, actor, result):
+    table = model.__table__
+    rows = session.execute(
+        select(table)
+        .where(table.c.id.in_(chunk), table.c.is_deleted.is_(False))
+        .with_for_update()
+    ).mappings().all()
+    current = {row["id"]: row for row in rows}
+
+    by_lock_version = {}
+    for entity_id in chunk:
+        row = current.get(entity_id)
+        if row is None:
+            result["not_found"].append(entity_id)
+        elif row["lock_version"] != items[entity_id]:
+            result["conflicts"].append(entity_id)
+        elif all(_json_value(row[name]) == _json_value(value) for name, value in values.items()):
+            result["unchanged"].append(entity_id)
+        else:
+            by_lock_version.setdefault(row["lock_version"], []).append(entity_id)
+    if not by_lock_version:
+        return
+
+    now = datetime.utcnow()
+    returning = session.get_bind().dialect.update_returning
+    updated_ids = []
+    for lock_version, ids in by_lock_version.items():
+        statement = (
+            update(table)
+            .where(table.c.id.in_(ids), table.c.lock_version == lock_version)
+            .values(**values, lock_version=table.c.lock_version + 1, updated_at=now, updated_by=actor)
+        )
+        if returning:
+            matched = set(session.execute(statement.returning(table.c.id)).scalars())
+        else:
+            # Rows are locked by the SELECT ... FOR UPDATE above, so all of them match.
+            session.execute(statement)
+            matched = set(ids)
+        updated_ids.extend(entity_id for entity_id in ids if entity_id in matched)
+        result["conflicts"].extend(entity_id for entity_id in ids if entity_id not in matched)
+
+    entity_type = table.name
+    previous = _latest_versions(session, entity_type, updated_ids)
+    new_values = {name: _json_value(value) for name, value in values.items()}
+    version_rows = []
+    for entity_id in updated_ids:
+        version, old_snapshot, chain_hash = previous.get(entity_id, (0, None, None))
+        if old_snapshot is None:
+            old_snapshot = _serialize_row(model, current[entity_id])
+        snapshot = {**old_snapshot, **new_values}
+        version_rows.append(_version_values(
+            entity_type,
+            entity_id,
+            version + 1,
+            "update",
+            snapshot,
+            _diff_snapshots(old_snapshot, snapshot),
+            actor,
+            now,
+            previous_chain_hash=chain_hash,
+            lock_version=current[entity_id]["lock_version"] + 1,
+        ))
+    _insert_versions(session, version_rows)
+    result["updated"].extend(updated_ids)
+
+
+def bulk_update(session, model, items, values, actor, chunk_size=BULK_CHUNK_SIZE):
+    """Apply `values` (column -> value) to every id in `items` ({id: expected lock_version}).
+
+    Commits after each chunk and returns {"updated", "unchanged", "conflicts", "not_found"}.
+    """
+    result = _empty_result()
+    ids = sorted(items)
+    for start in range(0, len(ids), chunk_size):
+        try:
+            _update_chunk(session, model, ids[start:start + chunk_size], items, values, actor, result)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+    return result
+
+
+def bulk_soft_delete(session, model, items, actor, chunk_size=BULK_CHUNK_SIZE):
+    """Soft-delete every id in `items` ({id: expected lock_version}); see `bulk_update`."""
+    values = {"is_deleted": True, "deleted_at": datetime.utcnow(), "deleted_by": actor}
+    return bulk_update(session, model, items, values, actor, chunk_size=chunk_size)
+
+
+def conditional_update(session, model, entity_id, lock_version, values, actor, batch=None):
+    """Apply scalar `values` to one row if it still has `lock_version`; no commit.
+
+    The UPDATE only matches when some value actually changes, so a no-op patch neither bumps
+    `lock_version` nor writes history. Only when it matches no row is the row read, to tell
+    "not_found" from "conflict" and "unchanged". Returns (status, row, snapshot) with the
+    current row (None if not found) and the entity's snapshot after the call, or None when
+    the entity has no history yet (the caller then uses the ORM path). With a `VersionBatch`
+    the history row is added to it instead of being inserted.
+    """
+    table = model.__table__
+    entity_type = table.name
+    history = batch if batch is not None else VersionBatch()
+    latest = history.previous(session, entity_type, entity_id)
+    if latest is None:
+        return None
+    version, old_snapshot, chain_hash = latest
+
+    now = datetime.utcnow()
+    statement = (
+        update(table)
+        .where(
+            table.c.id == entity_id,
+            table.c.lock_version == lock_version,
+            table.c.is_deleted.is_(False),
+            or_(*(table.c[name].is_distinct_from(value) for name, value in values.items())),
+        )
+        .values(**values, lock_version=table.c.lock_version + 1, updated_at=now, updated_by=actor)
+    )
+    current = select(table).where(table.c.id == entity_id)
+    if session.get_bind().dialect.update_returning:
+        row = session.execute(statement.returning(*table.c)).mappings().first()
+        if row is not None:
+            # SQLite 3.40 returns INTEGER columns as REAL when the table's first column is REAL.
+            row = {
+                name: int(value) if value is not None and isinstance(table.c[name].type, Integer) else value
+                for name, value in row.items()
+            }
+    else:
+        row = session.execute(current).mappings().first() if session.execute(statement).rowcount else None
+    if row is None:
+        row = session.execute(current).mappings().first()
+        if row is None or row["is_deleted"]:
+            return "not_found", None, None
+        return ("conflict" if row["lock_version"] != lock_version else "unchanged"), row, old_snapshot
+
+    snapshot = {**old_snapshot, **{name: _json_value(value) for name, value in values.items()}}
+    history.add(_version_values(
+        entity_type,
+        entity_id,
+        version + 1,
+        "update",
+        snapshot,
+        _diff_snapshots(old_snapshot, snapshot),
+        actor,
+        now,
+        previous_chain_hash=chain_hash,
+        lock_version=row["lock_version"],
+    ))
+    if batch is None:
+        history.flush(session)
+    return "updated", row, snapshot
+
+
+def insert_entity(session, model, values, actor, batch):
+    """Insert one entity with Core and add its "create" history row to `batch`; returns the row."""
+    table = model.__table__
+    now = datetime.utcnow()
+    row = {
+        **values,
+        "created_at": now,
+        "created_by": actor,
+        "updated_at": now,
+        "updated_by": actor,
+        "lock_version": 1,
+        "is_deleted": False,
+        "deleted_at": None,
+        "deleted_by": None,
+    }
+    row["id"] = session.execute(insert(table).values(**row)).inserted_primary_key[0]
+    previous = batch.previous(session, table.name, row["id"])
+    version, _, chain_hash = previous if previous else (0, None, None)
+    batch.add(_version_values(
+        table.name, row["id"], version + 1, "create", _serialize_row(model, row), {}, actor, now,
+        previous_chain_hash=chain_hash, lock_version=1,
+    ))
+    return row
+
+
+def _bump_locked(session, table, by_lock_version, now, actor):
+    """Bump lock_version of the ids grouped by expected version; returns the ids that matched."""
+    returning = session.get_bind().dialect.update_returning
+    matched_ids = []
+    for lock_version, ids in by_lock_version.items():
+        statement = (
+            update(table)
+            .where(table.c.id.in_(ids), table.c.lock_version == lock_version)
+            .values(lock_version=table.c.lock_version + 1, updated_at=now, updated_by=actor)
+        )
+        if returning:
+            matched = set(session.execute(statement.returning(table.c.id)).scalars())
+        else:
+            session.execute(statement)
+            matched = set(ids)
+        matched_ids.extend(entity_id for entity_id in ids if entity_id in matched)
+    return matched_ids
+
+
+def _linked_signal_ids(session, asset_id):
+    return set(session.execute(
+        select(asset_signals.c.signal_id).where(asset_signals.c.asset_id == asset_id)
+    ).scalars())
+
+
+def _membership_chunk(session, chunk, items, add, remove, actor, result):
+    assets = Asset.__table__
+    rows = session.execute(
+        select(assets)
+        .where(assets.c.id.in_(chunk), assets.c.is_deleted.is_(False))
+        .with_for_update()
+    ).mappings().all()
+    current = {row["id"]: row for row in rows}
+    candidates = []
+    for asset_id in chunk:
+        row = current.get(asset_id)
+        if row is None:
+            result["not_found"].append(asset_id)
+        elif row["lock_version"] != items[asset_id]:
+            result["conflicts"].append(asset_id)
+        else:
+            candidates.append(asset_id)
+    if not candidates:
+        return
+
+    touched = add | remove
+    linked = {}
+    for asset_id, signal_id in session.execute(
+        select(asset_signals.c.asset_id, asset_signals.c.signal_id)
+        .where(asset_signals.c.asset_id.in_(candidates), asset_signals.c.signal_id.in_(touched))
+    ):
+        linked.setdefault(asset_id, set()).add(signal_id)
+    deltas = {}
+    by_lock_version = {}
+    for asset_id in candidates:
+        existing = linked.get(asset_id, set())
+        added, removed = add - existing, remove & existing
+        if added or removed:
+            deltas[asset_id] = (sorted(added), sorted(removed))
+            by_lock_version.setdefault(current[asset_id]["lock_version"], []).append(asset_id)
+        else:
+            result["unchanged"].append(asset_id)
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    updated_ids = _bump_locked(session, assets, by_lock_version, now, actor)
+    matched = set(updated_ids)
+    result["conflicts"].extend(asset_id for asset_id in deltas if asset_id not in matched)
+    if not updated_ids:
+        return
+    links = [
+        {"asset_id": asset_id, "signal_id": signal_id}
+        for asset_id in updated_ids
+        for signal_id in deltas[asset_id][0]
+    ]
+    if links:
+        session.execute(asset_signals.insert(), links)
+    if remove:
+        session.execute(
+            delete(asset_signals)
+            .where(asset_signals.c.asset_id.in_(updated_ids), asset_signals.c.signal_id.in_(remove))
+        )
+
+    previous = _latest_versions(session, assets.name, updated_ids)
+    version_rows = []
+    for asset_id in updated_ids:
+        added, removed = deltas[asset_id]
+        version, old_snapshot, chain_hash = previous.get(asset_id, (0, None, None))
+        if old_snapshot is None:
+            # No history yet: the links were already changed above, so undo the delta.
+            old_snapshot = _serialize_row(Asset, current[asset_id])
+            old_snapshot["signal_ids"] = sorted((_linked_signal_ids(session, asset_id) - set(added)) | set(removed))
+        kept = set(old_snapshot.get("signal_ids", [])) - set(removed)
+        snapshot = {**old_snapshot, "signal_ids": sorted(kept | set(added))}
+        version_rows.append(_version_values(
+            assets.name, asset_id, version + 1, "update", snapshot,
+            {"signal_ids": {"added": added, "removed": removed}}, actor, now, previous_chain_hash=chain_hash,
+            lock_version=current[asset_id]["lock_version"] + 1,
+        ))
+    _insert_versions(session, version_rows)
+    result["updated"].extend(updated_ids)
+
+
+def bulk_membership(session, items, add, remove, actor, chunk_size=BULK_CHUNK_SIZE):
+    """Link signals `add` to and unlink `remove` from every asset in `items` ({id: lock_version}).
+
+    Signal ids that do not exist or are in the trash are not linked. Commits after each chunk
+    of assets and returns {"updated", "unchanged", "conflicts", "not_found"}.
+    """
+    result = _empty_result()
+    signals = Signal.__table__
+    add = set(add or ())
+    if add:
+        add = set(session.execute(
+            select(signals.c.id).where(signals.c.id.in_(add), signals.c.is_deleted.is_(False))
+        ).scalars())
+    remove = set(remove or ())
+    ids = sorted(items)
+    for start in range(0, len(ids), chunk_size):
+        try:
+            _membership_chunk(session, ids[start:start + chunk_size], items, add, remove, actor, result)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+    return result
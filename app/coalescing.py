@@ -0,0 +1,146 @@
+"""Single-flight GETs: identical concurrent list requests share one query and one body.
+
+`@coalesced` (under `@api_bp.route`) keys a request by endpoint, path, query string, JWT
+identity and the process commit generation. The first request with a key runs the view;
+requests with the same key that arrive while it runs wait for it and get a copy of its
+status, headers and body instead of querying again. With `READ_COALESCING_TTL` > 0 the
+result is also reused for that many seconds after it finished.
+
+Read-your-writes: every commit in this process starts a new generation, so a request never
+joins a flight (or reuses a result) from before a write committed here. Clients carrying the
+`read_primary` cookie or a recent `X-Last-Write` header (they wrote recently, see replicas.py)
+always run the view themselves.
+Writes committed by other worker processes can be missed for up to the TTL.
+
+Only use it on views whose response depends on nothing but the path, query string and user.
+"""
+from functools import wraps
+from itertools import count
+import threading
+import time
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+
+from caching import BoundedCache
+from replicas import READ_METHODS, RoutingSession, wrote_recently
+
+
+class _Flight:
+    __slots__ = ("done", "result", "failed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers with the same key share its result."""
+
+    def __init__(self, ttl=0.0, maxsize=256, wait_timeout=30.0):
+        self.enabled = True
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.results = BoundedCache(maxsize)
+        self.generation = 0
+        self._generations = count(1)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get("READ_COALESCING", self.enabled)
+        self.ttl = app.config.get("READ_COALESCING_TTL", self.ttl)
+        self.results.maxsize = app.config.get("READ_COALESCING_CACHE_SIZE", self.results.maxsize)
+        self.wait_timeout = app.config.get("WEB_TIMEOUT", self.wait_timeout)
+        app.extensions["read_coalescing"] = self
+
+    def invalidate(self):
+        """Start a new generation: later calls neither join earlier flights nor reuse their results."""
+        self.generation = next(self._generations)
+
+    def do(self, key, fn):
+        if self.ttl > 0:
+            cached = self.results.get(key)
+            if cached is not None:
+                return cached
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            if flight.done.wait(self.wait_timeout) and not flight.failed:
+                return flight.result
+            # The leader failed or is stuck: run the call for this caller alone.
+            with self._lock:
+                self.fallbacks += 1
+            return fn()
+        try:
+            flight.result = fn()
+            if self.ttl > 0:
+                self.results.set(key, flight.result, expires_at=time.time() + self.ttl)
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "fallbacks": self.fallbacks,
+            "in_flight": len(self._flights),
+            "generation": self.generation,
+            "results": self.results.stats(),
+        }
+
+
+read_coalescing = SingleFlight()
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _new_generation(session):
+    read_coalescing.invalidate()
+
+
+def _frozen(rv):
+    response = current_app.make_response(rv)
+    headers = [(name, value) for name, value in response.headers if name.lower() != "content-length"]
+    return response.get_data(), response.status_code, headers
+
+
+def coalesced(view):
+    """Share the response of `view` between identical concurrent GET requests."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if (
+            not read_coalescing.enabled
+            or request.method not in READ_METHODS
+            or wrote_recently(request.cookies, request.headers, current_app.config["REPLICA_STICKY_SECONDS"])
+        ):
+            return view(*args, **kwargs)
+        key = (
+            request.endpoint,
+            request.path,
+            tuple(sorted(request.args.items(multi=True))),
+            get_jwt_identity(),
+            read_coalescing.generation,
+        )
+        body, status, headers = read_coalescing.do(key, lambda: _frozen(view(*args, **kwargs)))
+        return current_app.response_class(body, status=status, headers=headers)
+
+    return wrapper
@@ -0,0 +1,175 @@
+"""Group commit: concurrent small writes of one worker process share a transaction.
+
+With `GROUP_COMMIT=on`, `POST /api/signals` and scalar `PATCH /api/signals/<id>` /
+`/api/assets/<id>` (the conditional UPDATE path) do not commit themselves. The request thread
+queues its operation and waits; a committer thread collects operations until
+`GROUP_COMMIT_MAX_BATCH` are queued or `GROUP_COMMIT_MAX_DELAY_MS` passed since the first
+one, runs them in order in one transaction, inserts all their history rows in one statement
+(`VersionBatch`) and commits once. Every request gets its own result: created row, updated,
+unchanged, 404 or 409.
+
+If any operation raises, the batch is rolled back and its operations are retried one per
+transaction, so one failing request cannot fail the others. An operation still queued after
+`GROUP_COMMIT_WAIT_TIMEOUT` (well below `WEB_TIMEOUT`) is cancelled and its request gets 503;
+it never runs, so a retry is safe. An operation that started but has not finished by
+`WEB_TIMEOUT` gets 504: it may or may not have been committed. If the committer thread fails
+outside an operation, the futures of its batch get the error, and the next request starts a
+new thread.
+
+Trade-off: a request waits up to the delay for company, so at low concurrency each write is
+slower by up to GROUP_COMMIT_MAX_DELAY_MS; under bursts, one commit (one fsync) serves the
+whole batch. Measure with `benchmarks/bench_group_commit.py`.
+"""
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+import queue
+import threading
+import time
+
+from models import VersionBatch, db
+
+
+class GroupCommitTimeout(Exception):
+    """No result in time: 503 if the operation was cancelled unrun, 504 if its outcome is unknown."""
+
+    def __init__(self, message, status=503):
+        super().__init__(message)
+        self.status = status
+
+
+class GroupCommitter:
+    def __init__(self, max_batch=64, max_delay=0.005, wait_timeout=10.0, request_timeout=30.0):
+        self.enabled = False
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.wait_timeout = wait_timeout
+        self.request_timeout = request_timeout
+        self.app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+        self.retried_batches = 0
+        self.largest_batch = 0
+        self.timeouts = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get("GROUP_COMMIT", self.enabled)
+        self.max_batch = app.config.get("GROUP_COMMIT_MAX_BATCH", self.max_batch)
+        self.max_delay = app.config.get("GROUP_COMMIT_MAX_DELAY_MS", self.max_delay * 1000) / 1000
+        self.wait_timeout = app.config.get("GROUP_COMMIT_WAIT_TIMEOUT", self.wait_timeout)
+        self.request_timeout = app.config.get("WEB_TIMEOUT", self.request_timeout)
+        self.app = app
+        app.extensions["group_commit"] = self
+
+    def submit(self, operation):
+        """Run `operation(session, batch)` in the next group transaction and return its result.
+
+        Raises `GroupCommitTimeout` (503) if the operation did not finish within
+        `GROUP_COMMIT_WAIT_TIMEOUT` and had not started; it is then cancelled and never runs, so
+        the client can retry. Once it has started, the call waits for its outcome until
+        `WEB_TIMEOUT` in total, then raises `GroupCommitTimeout` with status 504. The caller
+        marks the request as a write for replicas.mark_sticky only when the result changed
+        something.
+        """
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((operation, future))
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                self.timeouts += 1
+                raise GroupCommitTimeout("Write queue is busy, try again") from None
+        try:
+            return future.result(timeout=max(self.request_timeout - self.wait_timeout, 0))
+        except FutureTimeoutError:
+            self.timeouts += 1
+            raise GroupCommitTimeout(
+                "Write did not finish in time and may have been applied; reload before retrying", status=504
+            ) from None
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                with self.app.app_context():
+                    self._commit(batch)
+            except BaseException as exc:
+                # Never leave a request thread waiting on a future nobody will resolve.
+                for _, future in batch:
+                    if not future.done():
+                        try:
+                            future.set_exception(exc)
+                        except InvalidStateError:  # cancelled meanwhile
+                            pass
+                if not isinstance(exc, Exception):
+                    raise
+
+    def _apply(self, session, batch):
+        history = VersionBatch()
+        results = [operation(session, history) for operation, _ in batch]
+        history.flush(session)
+        session.commit()
+        return results
+
+    def _commit(self, batch):
+        # Operations whose caller gave up (cancelled) are dropped here.
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        session = db.session
+        self.batches += 1
+        self.operations += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = self._apply(session, batch)
+        except Exception:
+            session.rollback()
+            self.retried_batches += 1
+            for item in batch:
+                try:
+                    (result,) = self._apply(session, [item])
+                except Exception as exc:
+                    session.rollback()
+                    item[1].set_exception(exc)
+                else:
+                    item[1].set_result(result)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "batches": self.batches,
+            "operations": self.operations,
+            "largest_batch": self.largest_batch,
+            "retried_batches": self.retried_batches,
+            "timeouts": self.timeouts,
+            "queued": self._queue.qsize(),
+        }
+
+
+group_commit = GroupCommitter()
@@ -0,0 +1,229 @@
+"""History helpers: cached version lists, net diffs between versions and maintenance commands.
+
+    flask --app app/app.py history backfill-summaries --batch-size 1000
+
+`entity_versions.summary` holds the `what_changed` lines of the changes feed. New rows get it
+when they are written (`_version_values`); the backfill fills rows written before the column
+existed, walking the primary key in batches with one short transaction per batch.
+"""
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Text, bindparam, cast, select, update
+
+from caching import BoundedCache
+from models import EntityVersion, _change_summary, _diff_snapshots, db
+from schemas import VersionResponse, version_to_response
+from serializers import dump_one_raw, join_list
+
+# Serialized version lists: (entity_type, entity_id) -> (newest version, its chain_hash,
+# [item bytes, newest first]). A new version is serialized and prepended, the older items are
+# reused as they are. `audit backfill-chain` rewrites chain_hash on existing rows, which always
+# changes the newest row's chain_hash too, so an entry is only reused while that still matches.
+# Bounded by VERSION_HISTORY_CACHE_SIZE entities and VERSION_HISTORY_CACHE_BYTES serialized
+# bytes, so a few entities with long histories cannot take the worker's memory.
+history_cache = BoundedCache(512, maxbytes=64 * 1024 * 1024)
+
+# Net diffs keyed by (entity_type, entity_id, from, to). History rows are never updated,
+# so entries need no expiry; the size comes from VERSION_DIFF_CACHE_SIZE.
+diff_cache = BoundedCache(1024)
+
+
+def cache_history(key, history):
+    """Store a (version, chain_hash, items) list in `history_cache`, sized by its serialized bytes."""
+    if history[2]:
+        history_cache.set(key, history, size=sum(len(item) for item in history[2]))
+
+
+def evict_entities(entity_type, entity_ids):
+    """Drop this process's cached version lists and diffs of the given entities (e.g. purged ones)."""
+    ids = set(entity_ids)
+    for key in history_cache.keys():
+        if key[0] == entity_type and key[1] in ids:
+            history_cache.pop(key)
+    for key in diff_cache.keys():
+        if key[0] == entity_type and key[1] in ids:
+            diff_cache.pop(key)
+
+
+# History columns for responses; `snapshot` and `diff` come back as the stored JSON text.
+RAW_VERSION_FIELDS = ("snapshot", "diff")
+VERSION_COLUMNS = [
+    cast(column, Text).label(column.key) if column.key in RAW_VERSION_FIELDS else column
+    for column in (
+        EntityVersion.id,
+        EntityVersion.entity_type,
+        EntityVersion.entity_id,
+        EntityVersion.version,
+        EntityVersion.operation,
+        EntityVersion.snapshot,
+        EntityVersion.diff,
+        EntityVersion.hash,
+        EntityVersion.chain_hash,
+        EntityVersion.changed_at,
+        EntityVersion.changed_by,
+    )
+]
+
+
+def select_versions(*criteria):
+    """SELECT of `VERSION_COLUMNS` for the history rows matching `criteria`."""
+    return select(*VERSION_COLUMNS).where(*criteria)
+
+
+def dump_version(row) -> bytes:
+    """VersionResponse JSON of a `select_versions` row, without decoding snapshot and diff."""
+    return dump_one_raw(VersionResponse, version_to_response(row), RAW_VERSION_FIELDS)
+
+
+def version_cache_control(row):
+    """Cache-Control of a single version: immutable once its chain_hash is set.
+
+    Rows written before the hash chain get theirs from `audit backfill-chain`, so until then
+    clients revalidate (the ETag changes from `hash` to `chain_hash`).
+    """
+    if row.chain_hash is None:
+        return "private, no-cache"
+    return "private, max-age=31536000, immutable"
+
+
+def newest_version(entity_type, entity_id):
+    """SELECT of (version, chain_hash) of the entity's newest history row."""
+    return (
+        select(EntityVersion.version, EntityVersion.chain_hash)
+        .where(EntityVersion.entity_type == entity_type, EntityVersion.entity_id == entity_id)
+        .order_by(EntityVersion.version.desc())
+        .limit(1)
+    )
+
+
+def current_history(cached, newest):
+    """`cached` if it is still current for the `newest_version` row, else None."""
+    if cached is None:
+        return None
+    version, chain_hash = newest if newest is not None else (0, None)
+    # >: a lagging read replica may not have the newest rows the cache already holds.
+    if cached[0] > version or (cached[0], cached[1]) == (version, chain_hash):
+        return cached
+    return None
+
+
+def history_rows(entity_type, entity_id, cached):
+    """SELECT of the rows `extend_history` needs: from the cached newest version on, or all."""
+    return select_versions(
+        EntityVersion.entity_type == entity_type,
+        EntityVersion.entity_id == entity_id,
+        EntityVersion.version >= (cached[0] if cached is not None else 0),
+    ).order_by(EntityVersion.version.desc())
+
+
+def extend_history(cached, rows):
+    """(version, chain_hash, items) with the `history_rows` rows added to `cached`.
+
+    Returns None when the cached newest row no longer matches the stored one (its chain_hash
+    was rewritten); the caller then reloads the whole list with `cached=None`.
+    """
+    if cached is None:
+        if not rows:
+            return 0, None, []
+        return rows[0].version, rows[0].chain_hash, [dump_version(row) for row in rows]
+    known, chain_hash, items = cached
+    if not rows or rows[-1].version != known or rows[-1].chain_hash != chain_hash:
+        return None
+    newer = rows[:-1]
+    if not newer:
+        return cached
+    return newer[0].version, newer[0].chain_hash, [dump_version(row) for row in newer] + items
+
+
+def history_etag(entity_type, entity_id, history):
+    """ETag of a version list: newest version and its chain_hash (which backfill-chain changes)."""
+    return f"{entity_type}-{entity_id}-{history[0]}-{(history[1] or '')[:16]}"
+
+
+def version_history(session, entity_type, entity_id):
+    """All versions of one entity as a JSON array (newest first) and its ETag.
+
+    Costs one indexed lookup of the newest row when the cached list is current; otherwise only
+    the versions after the cached one are loaded and serialized.
+    """
+    key = (entity_type, entity_id)
+    cached = history_cache.get(key)
+    history = current_history(cached, session.execute(newest_version(entity_type, entity_id)).first())
+    if history is None:
+        history = extend_history(cached, session.execute(history_rows(entity_type, entity_id, cached)).all())
+        if history is None:
+            history = extend_history(None, session.execute(history_rows(entity_type, entity_id, None)).all())
+        cache_history(key, history)
+    return join_list(history[2]), history_etag(entity_type, entity_id, history)
+
+
+def version_diff(session, entity_type, entity_id, from_version, to_version):
+    """Net {field: {"old", "new"}} from one version to another, or None if either is missing.
+
+    Every history row stores the full snapshot, so comparing the two snapshots reads two rows
+    however many versions lie between them; composing the stored diffs would read all of them.
+    """
+    rows = dict(
+        session.query(EntityVersion.version, EntityVersion.snapshot)
+        .filter(
+            EntityVersion.entity_type == entity_type,
+            EntityVersion.entity_id == entity_id,
+            EntityVersion.version.in_(sorted({from_version, to_version})),
+        )
+        .all()
+    )
+    if from_version not in rows or to_version not in rows:
+        return None
+    return _diff_snapshots(rows[from_version] or {}, rows[to_version] or {})
+
+
+def summaries_for(session, ids):
+    """{id: summary} computed from diff/snapshot, for rows whose summary is not stored."""
+    if not ids:
+        return {}
+    rows = (
+        session.query(EntityVersion.id, EntityVersion.operation, EntityVersion.snapshot, EntityVersion.diff)
+        .filter(EntityVersion.id.in_(ids))
+        .all()
+    )
+    return {row.id: _change_summary(row.operation, row.snapshot, row.diff) for row in rows}
+
+
+def backfill_summaries(session, batch_size=1000, log=None):
+    """Store `summary` for every row that has none; returns the number of rows updated."""
+    statement = (
+        update(EntityVersion.__table__)
+        .where(EntityVersion.__table__.c.id == bindparam("row_id"))
+        .values(summary=bindparam("new_summary"))
+    )
+    after_id = 0
+    updated = 0
+    while True:
+        ids = [
+            row.id for row in
+            session.query(EntityVersion.id)
+            .filter(EntityVersion.id > after_id, EntityVersion.summary.is_(None))
+            .order_by(EntityVersion.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        summaries = summaries_for(session, ids)
+        session.execute(statement, [{"row_id": row_id, "new_summary": summaries[row_id]} for row_id in ids])
+        session.commit()
+        after_id = ids[-1]
+        updated += len(ids)
+        if log:
+            log(f"{updated} rows updated (up to id {after_id})")
+    return updated
+
+
+history_cli = AppGroup("history", help="History maintenance commands.")
+
+
+@history_cli.command("backfill-summaries")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Rows per transaction.")
+def backfill_summaries_command(batch_size):
+    """Compute the changes-feed summary for history rows written before it was stored."""
+    updated = backfill_summaries(db.session, batch_size=batch_size, log=click.echo)
+    click.echo(f"{updated} rows updated")
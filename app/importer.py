@@ -0,0 +1,298 @@
+"""Bulk import of signals and assets from CSV or NDJSON files.
+
+    flask --app app/app.py import signals signals.csv --errors signal-errors.ndjson
+    flask --app app/app.py import assets assets.ndjson --checkpoint assets.json --resume
+
+Every record has a `key` (stored as `external_key`) plus the fields of `SignalCreateRequest`
+or `AssetCreateRequest`. Assets reference signals by key in `signal_keys`: a list in NDJSON,
+"|"-separated in CSV. The file is streamed in batches of `--batch-size` records. Each batch:
+
+1. is validated with the request schema in one `TypeAdapter` call; invalid records are
+   reported and the rest of the batch goes on;
+2. skips keys that already exist, so running a file again is safe;
+3. is written in one transaction: a multi-row INSERT of the entities, one of the
+   `asset_signals` links and one of the "create" history rows (through `_insert_versions`,
+   so the version hooks run as for API writes).
+
+Errors are written to `--errors` as NDJSON (`{"line", "key", "error"}`). With `--checkpoint`
+the last committed line is saved after every batch, and `--resume` continues after it.
+"""
+import csv
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import json
+import os
+from pathlib import Path
+
+import click
+from flask.cli import AppGroup
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+
+from models import Asset, Signal, _insert_versions, _serialize_row, _version_values, asset_signals, db
+from schemas import AssetCreateRequest, SignalCreateRequest
+
+IMPORT_ACTOR = "import"
+IMPORT_BATCH_SIZE = 1000
+KEY_SEPARATOR = "|"
+
+
+def read_records(path, fmt=None):
+    """Yield (line, record, error) from a CSV (header row) or NDJSON file."""
+    fmt = fmt or ("csv" if str(path).lower().endswith(".csv") else "ndjson")
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            reader = csv.DictReader(handle)
+            for record in reader:
+                yield reader.line_num, record, None
+            return
+        for line, text in enumerate(handle, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as exc:
+                yield line, None, f"invalid JSON: {exc}"
+                continue
+            if not isinstance(record, dict):
+                yield line, None, "record must be a JSON object"
+                continue
+            yield line, record, None
+
+
+@lru_cache(maxsize=None)
+def _batch_adapter(schema):
+    return TypeAdapter(list[schema])
+
+
+def _validate(schema, records):
+    """Validate a batch in one call; returns ([(index, model)], {index: message})."""
+    adapter = _batch_adapter(schema)
+    try:
+        return list(enumerate(adapter.validate_python(records))), {}
+    except ValidationError as exc:
+        invalid = {}
+        for error in exc.errors():
+            index, *field = error["loc"]
+            message = error["msg"]
+            invalid.setdefault(index, f"{'.'.join(map(str, field))}: {message}" if field else message)
+    valid = [index for index in range(len(records)) if index not in invalid]
+    models = adapter.validate_python([records[index] for index in valid])
+    return list(zip(valid, models)), invalid
+
+
+def _split_keys(batch, errors):
+    """[(line, key, record without key)] for records with a usable key, unique in the batch."""
+    keyed, seen = [], set()
+    for line, record, error in batch:
+        if error:
+            errors.append((line, None, error))
+            continue
+        record = dict(record)
+        key = str(record.pop("key", "") or "").strip()
+        if not key:
+            errors.append((line, None, "key is required"))
+        elif key in seen:
+            errors.append((line, key, "duplicate key in file"))
+        else:
+            seen.add(key)
+            keyed.append((line, key, record))
+    return keyed
+
+
+def _validated(schema, keyed, errors):
+    valid, invalid = _validate(schema, [record for _, _, record in keyed])
+    errors.extend((keyed[index][0], keyed[index][1], message) for index, message in sorted(invalid.items()))
+    return [(keyed[index][0], keyed[index][1], request) for index, request in valid]
+
+
+def _existing_keys(session, table, keys):
+    if not keys:
+        return set()
+    return set(session.execute(select(table.c.external_key).where(table.c.external_key.in_(keys))).scalars())
+
+
+def _insert_entities(session, model, entries, actor, links=None):
+    """Insert entries [(key, column values)] plus their "create" history; returns {key: id}."""
+    table = model.__table__
+    now = datetime.utcnow()
+    rows = [
+        {
+            **values,
+            "external_key": key,
+            "created_at": now,
+            "created_by": actor,
+            "updated_at": now,
+            "updated_by": actor,
+            "lock_version": 1,
+            "is_deleted": False,
+            "deleted_at": None,
+            "deleted_by": None,
+        }
+        for key, values in entries
+    ]
+    session.execute(insert(table), rows)
+    keys = [key for key, _ in entries]
+    ids = dict(session.execute(select(table.c.external_key, table.c.id).where(table.c.external_key.in_(keys))).all())
+
+    if links:
+        link_rows = [
+            {"asset_id": ids[key], "signal_id": signal_id}
+            for key, signal_ids in links.items()
+            for signal_id in signal_ids
+        ]
+        if link_rows:
+            session.execute(asset_signals.insert(), link_rows)
+
+    version_rows = []
+    for row in rows:
+        entity_id = ids[row["external_key"]]
+        snapshot = _serialize_row(model, {**row, "id": entity_id})
+        if links is not None:
+            snapshot["signal_ids"] = sorted(links.get(row["external_key"], ()))
+        version_rows.append(_version_values(table.name, entity_id, 1, "create", snapshot, {}, actor, now, lock_version=1))
+    _insert_versions(session, version_rows)
+    return ids
+
+
+def import_signals_batch(session, batch, actor, errors):
+    """Import one batch of signal records; returns (inserted, skipped)."""
+    entries = _validated(SignalCreateRequest, _split_keys(batch, errors), errors)
+    existing = _existing_keys(session, Signal.__table__, [key for _, key, _ in entries])
+    entries = [(key, request.model_dump()) for _, key, request in entries if key not in existing]
+    if entries:
+        _insert_entities(session, Signal, entries, actor)
+    return len(entries), len(existing)
+
+
+def _signal_keys(value):
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        return [key.strip() for key in value.split(KEY_SEPARATOR) if key.strip()]
+    if isinstance(value, list):
+        return [str(key).strip() for key in value]
+    return None
+
+
+def import_assets_batch(session, batch, actor, errors):
+    """Import one batch of asset records; signal references must already be imported."""
+    keyed, signal_keys = [], {}
+    for line, key, record in _split_keys(batch, errors):
+        signal_keys[line] = _signal_keys(record.pop("signal_keys", None))
+        if signal_keys[line] is None:
+            errors.append((line, key, "signal_keys must be a list or a \"|\"-separated string"))
+        else:
+            keyed.append((line, key, record))
+    entries = _validated(AssetCreateRequest, keyed, errors)
+    existing = _existing_keys(session, Asset.__table__, [key for _, key, _ in entries])
+    entries = [entry for entry in entries if entry[1] not in existing]
+
+    signals = Signal.__table__
+    wanted_keys = {signal_key for line, _, _ in entries for signal_key in signal_keys[line]}
+    wanted_ids = {signal_id for _, _, request in entries for signal_id in request.signal_ids}
+    by_key = dict(session.execute(
+        select(signals.c.external_key, signals.c.id)
+        .where(signals.c.external_key.in_(wanted_keys), signals.c.is_deleted.is_(False))
+    ).all()) if wanted_keys else {}
+    live_ids = set(session.execute(
+        select(signals.c.id).where(signals.c.id.in_(wanted_ids), signals.c.is_deleted.is_(False))
+    ).scalars()) if wanted_ids else set()
+
+    rows, links = [], {}
+    for line, key, request in entries:
+        missing = [signal_key for signal_key in signal_keys[line] if signal_key not in by_key]
+        if missing:
+            errors.append((line, key, f"unknown signal keys: {', '.join(missing)}"))
+            continue
+        # Like the API, signal ids that do not exist or are in the trash are dropped.
+        links[key] = {by_key[signal_key] for signal_key in signal_keys[line]} | (set(request.signal_ids) & live_ids)
+        rows.append((key, {"name": request.name, "description": request.description}))
+    if rows:
+        _insert_entities(session, Asset, rows, actor, links=links)
+    return len(rows), len(existing)
+
+
+IMPORTERS = {"signals": import_signals_batch, "assets": import_assets_batch}
+
+
+def _read_checkpoint(path):
+    if path and Path(path).exists():
+        return json.loads(Path(path).read_text()).get("line", 0)
+    return 0
+
+
+def _write_checkpoint(path, line):
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps({"line": line, "updated_at": datetime.utcnow().isoformat()}))
+    os.replace(tmp, path)
+
+
+def run_import(session, kind, path, fmt=None, batch_size=IMPORT_BATCH_SIZE, actor=IMPORT_ACTOR,
+               errors_path=None, checkpoint=None, after_line=0, log=None):
+    """Import `path` batch by batch, one transaction per batch; returns the totals."""
+    import_batch = IMPORTERS[kind]
+    totals = {"inserted": 0, "skipped": 0, "errors": 0}
+    records = ((line, record, error) for line, record, error in read_records(path, fmt) if line > after_line)
+    error_file = open(errors_path, "a", encoding="utf-8") if errors_path else None
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            errors = []
+            try:
+                inserted, skipped = import_batch(session, batch, actor, errors)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            totals["inserted"] += inserted
+            totals["skipped"] += skipped
+            totals["errors"] += len(errors)
+            if error_file:
+                for line, key, message in errors:
+                    error_file.write(json.dumps({"line": line, "key": key, "error": message}) + "\n")
+                error_file.flush()
+            if checkpoint:
+                _write_checkpoint(checkpoint, batch[-1][0])
+            if log:
+                log(f"{kind}: line {batch[-1][0]}, {totals['inserted']} inserted, "
+                    f"{totals['skipped']} already present, {totals['errors']} errors")
+    finally:
+        if error_file:
+            error_file.close()
+    return totals
+
+
+import_cli = AppGroup("import", help="Bulk import commands.")
+
+
+def _import_command(kind):
+    @import_cli.command(kind, help=f"Import {kind} from a CSV or NDJSON file (record format: see importer.py).")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None,
+                  help="File format (default: from the extension, .csv or NDJSON).")
+    @click.option("--batch-size", type=int, default=IMPORT_BATCH_SIZE, show_default=True, help="Records per transaction.")
+    @click.option("--errors", "errors_path", type=click.Path(dir_okay=False), default=None,
+                  help="Append per-record errors to this NDJSON file.")
+    @click.option("--checkpoint", type=click.Path(dir_okay=False), default=None, help="Progress file (last committed line).")
+    @click.option("--resume", is_flag=True, help="Continue after the line stored in --checkpoint.")
+    @click.option("--actor", default=IMPORT_ACTOR, show_default=True, help="created_by / changed_by of imported rows.")
+    def command(path, fmt, batch_size, errors_path, checkpoint, resume, actor):
+        if resume and not checkpoint:
+            raise click.UsageError("--resume requires --checkpoint")
+        totals = run_import(
+            db.session, kind, path, fmt=fmt, batch_size=batch_size, actor=actor, errors_path=errors_path,
+            checkpoint=checkpoint, after_line=_read_checkpoint(checkpoint) if resume else 0, log=click.echo,
+        )
+        click.echo(f"{kind}: {totals['inserted']} inserted, {totals['skipped']} already present, {totals['errors']} errors")
+        if totals["errors"]:
+            raise SystemExit(1)
+
+    return command
+
+
+import_signals_command = _import_command("signals")
+import_assets_command = _import_command("assets")
@@ -0,0 +1,61 @@
+"""Pluggable JSON provider for `jsonify`, `request.get_json` and `app.json`.
+
+`JSON_PROVIDER` picks the implementation:
+
+- `orjson` (default): orjson encodes and decodes in C and returns bytes, so `jsonify` skips
+  building an intermediate str. Output matches Flask's provider: sorted keys, compact
+  (indented in debug mode), RFC 822 dates and the same fallbacks for UUIDs, dataclasses and
+  `__html__`. Non-ASCII text is written as UTF-8 instead of `\\uXXXX` escapes. Values orjson
+  cannot encode (e.g. integers above 64 bits) go through the stdlib encoder.
+- `default`: Flask's `DefaultJSONProvider` (stdlib `json`).
+
+If orjson is not installed, `orjson` falls back to `default`.
+"""
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    options = 0
+    if orjson is not None:
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _dump_bytes(self, obj, indent=False):
+        options = self.options | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=_default, option=options)
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode()
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        return self._dump_bytes(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dump_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {"default": DefaultJSONProvider, "orjson": OrjsonProvider}
+
+
+def init_json_provider(app):
+    """Install the provider named by `JSON_PROVIDER` as `app.json`."""
+    name = app.config.get("JSON_PROVIDER", "default")
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER {name!r}; choose one of {', '.join(JSON_PROVIDERS)}")
+    if name == "orjson" and orjson is None:
+        app.logger.warning("JSON_PROVIDER=orjson but orjson is not installed; using the default provider")
+        name = "default"
+    app.json = JSON_PROVIDERS[name](app)
@@ -0,0 +1,142 @@
+"""Cache of verified JWT claims so repeat requests with the same token skip decode + HMAC check."""
+from datetime import datetime, timezone
+import hashlib
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import delete, select
+
+from caching import BoundedCache
+from models import RevokedToken
+
+
+def _token_digest(token):
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class VerifiedTokenCache:
+    """Verified (header, claims) keyed by token digest; entries never outlive the token's `exp`.
+
+    The cache is per process. `revoke()` evicts the token here and remembers its `jti`
+    until expiry, so neither a cache hit nor the blocklist check on full verification
+    accepts it again. Revocations are shared through the `revoked_tokens` table: every
+    process (Flask workers and the async API) loads the rows added since its last look at
+    most every `refresh_interval` seconds, before it checks a token.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300, refresh_interval=1.0):
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._cache = BoundedCache(maxsize)
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._revocations_seen = 0  # highest revoked_tokens.id loaded
+        self._refreshed_at = None
+
+    def init_app(self, app):
+        self._cache.maxsize = app.config.get("JWT_CACHE_SIZE", self._cache.maxsize)
+        self.ttl = app.config.get("JWT_CACHE_TTL", self.ttl)
+        self.refresh_interval = app.config.get("JWT_REVOCATION_REFRESH", self.refresh_interval)
+        app.extensions["jwt_cache"] = self
+
+    def get(self, token):
+        digest = _token_digest(token)
+        cached = self._cache.get(digest)
+        if cached is not None and self.is_revoked(cached[1].get("jti")):
+            self._cache.pop(digest)
+            return None
+        return cached
+
+    def put(self, token, header, claims):
+        expires_at = time.time() + self.ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, claims["exp"])
+        self._cache.set(_token_digest(token), (header, claims), expires_at=expires_at)
+
+    def revoke(self, jti, expires_at=None, token=None):
+        """Reject `jti` until `expires_at` and evict the cached entry for `token` if given."""
+        with self._lock:
+            self._prune_revoked()
+            self._revoked[jti] = expires_at if expires_at is not None else time.time() + self.ttl
+        if token is not None:
+            self._cache.pop(_token_digest(token))
+
+    def revocations_due(self):
+        """True (once per `refresh_interval`) when the shared revocations should be reloaded."""
+        now = time.monotonic()
+        with self._lock:
+            if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return False
+            self._refreshed_at = now
+            return True
+
+    def revocations_query(self):
+        """SELECT of the unexpired `revoked_tokens` rows this process has not loaded yet."""
+        return (
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.id > self._revocations_seen, RevokedToken.expires_at > datetime.utcnow())
+            .order_by(RevokedToken.id)
+        )
+
+    def apply_revocations(self, rows):
+        """Reject the `jti`s of `revocations_query` rows here too."""
+        for row in rows:
+            self.revoke(row.jti, expires_at=row.expires_at.replace(tzinfo=timezone.utc).timestamp())
+            self._revocations_seen = max(self._revocations_seen, row.id)
+
+    def refresh(self, engine):
+        """Load new shared revocations over a connection of `engine`, if due."""
+        if not self.revocations_due():
+            return
+        with engine.connect() as connection:
+            self.apply_revocations(connection.execute(self.revocations_query()).all())
+
+    def revoke_shared(self, session, jti, expires_at, token=None):
+        """Revoke here and record the `jti` for the other processes; drops expired rows. Commits."""
+        self.revoke(jti, expires_at=expires_at, token=token)
+        now = datetime.utcnow()
+        expires = datetime.utcfromtimestamp(expires_at) if expires_at is not None else now
+        session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        if not session.query(RevokedToken.id).filter_by(jti=jti).first():
+            session.add(RevokedToken(jti=jti, expires_at=max(expires, now)))
+        session.commit()
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _prune_revoked(self):
+        now = time.time()
+        for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[jti]
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        data = self._cache.stats()
+        data["revoked"] = len(self._revoked)
+        return data
+
+
+def bearer_token():
+    """Raw token from `Authorization: Bearer <token>`, or None."""
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme != "Bearer" or not token:
+        return None
+    return token.strip()
+
+
+def install_verified_jwt(header, claims):
+    """Populate the request context the same way `verify_jwt_in_request` does on success."""
+    g._jwt_extended_jwt_user = None
+    g._jwt_extended_jwt_header = header
+    g._jwt_extended_jwt = claims
+    g._jwt_extended_jwt_location = "headers"
+
+
+jwt_cache = VerifiedTokenCache()
@@ -0,0 +1,73 @@
+"""Three-way merge of stale PATCHes (opt-in with `"merge": true` in the body).
+
+The client's `lock_version` names the state it edited. The newest history row stored with
+that `lock_version` holds its snapshot (the merge base), and the diffs of every later version
+tell the server which fields other writers changed since the client loaded the entity. Lock
+versions and history version numbers are not the same (legacy rows, history that started
+after creation, bumps without a content change), so the base is never looked up by number:
+
+- fields the client sent with their base value are not part of its change and keep the
+  current value;
+- fields only the client changed are applied;
+- fields both sides changed are applied when both chose the same value. List fields
+  (`signal_ids`) merge as sets: the client's additions and removals are applied to the
+  current list. Any other field changed on both sides is a conflict.
+"""
+from sqlalchemy import func
+
+from models import EntityVersion, _serialize_entity
+
+
+def _same(left, right):
+    if isinstance(left, list) and isinstance(right, list):
+        return sorted(left) == sorted(right)
+    return left == right
+
+
+def _merge_sets(base, current, ours):
+    base, ours = set(base or []), set(ours)
+    return sorted((set(current or []) | (ours - base)) - (base - ours))
+
+
+def merge_stale_patch(session, entity, base_lock_version, patch):
+    """Rebase `patch` (field -> value) from `base_lock_version` onto the entity's current state.
+
+    Returns (changes, conflicts): the values to apply and the fields changed on both sides.
+    When no history row records `base_lock_version`, every patched field is a conflict.
+    """
+    of_entity = (
+        EntityVersion.entity_type == entity.__tablename__,
+        EntityVersion.entity_id == entity.id,
+    )
+    base_version = (
+        session.query(func.max(EntityVersion.version))
+        .filter(*of_entity, EntityVersion.lock_version == base_lock_version)
+        .scalar()
+    )
+    if base_version is None:
+        return {}, sorted(patch)
+    rows = (
+        session.query(EntityVersion.version, EntityVersion.snapshot, EntityVersion.diff)
+        .filter(*of_entity, EntityVersion.version >= base_version)
+        .order_by(EntityVersion.version)
+        .all()
+    )
+    base = rows[0].snapshot
+    changed_since = set()
+    for row in rows[1:]:
+        changed_since.update(row.diff or {})
+    current = _serialize_entity(entity)
+
+    changes, conflicts = {}, []
+    for field, value in patch.items():
+        if _same(value, base.get(field)):
+            continue
+        if field not in changed_since:
+            changes[field] = value
+        elif _same(value, current.get(field)):
+            continue
+        elif isinstance(value, list):
+            changes[field] = _merge_sets(base.get(field), current.get(field), value)
+        else:
+            conflicts.append(field)
+    return changes, sorted(conflicts)
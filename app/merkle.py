@@ -0,0 +1,66 @@
+"""Merkle trees over ranges of `entity_versions` rows (history checkpoints).
+
+Leaves are ordered by row id; a node is SHA-256 of its two children, and a node without a
+sibling is carried up unchanged. Leaf and node hashes use different prefixes so a leaf can
+never be presented as an inner node.
+"""
+import hashlib
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def leaf_hash(row_id, entity_type, entity_id, version, chain_hash):
+    return _sha256(f"leaf:{row_id}:{entity_type}:{entity_id}:{version}:{chain_hash}")
+
+
+def node_hash(left, right):
+    return _sha256(f"node:{left}{right}")
+
+
+def _next_level(level):
+    parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaves):
+    if not leaves:
+        return None
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_levels(leaves):
+    """Every level of the tree, leaves first and the root last."""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        levels.append(_next_level(levels[-1]))
+    return levels
+
+
+def proof_from_levels(levels, index):
+    """Sibling path of leaf `index` read from precomputed `merkle_levels`, in O(log n)."""
+    path = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append({"hash": level[sibling], "side": "left" if sibling < index else "right"})
+        index //= 2
+    return path
+
+
+def merkle_proof(leaves, index):
+    """Sibling path from leaf `index` to the root: [{"hash": ..., "side": "left" | "right"}]."""
+    return proof_from_levels(merkle_levels(leaves), index)
+
+
+def verify_proof(leaf, path, root):
+    current = leaf
+    for step in path:
+        current = node_hash(step["hash"], current) if step["side"] == "left" else node_hash(current, step["hash"])
+    return current == root
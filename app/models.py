@@ -2,11 +2,15 @@
 from datetime import datetime
 import hashlib
 import json
+from operator import attrgetter
 
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import event, func, inspect
+from sqlalchemy import DateTime, event, func, inspect, select
+from sqlalchemy.orm import configure_mappers
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 asset_signals = db.Table(
     "asset_signals",
@@ -17,7 +21,9 @@ asset_signals = db.Table(
 
 class VersionedMixin:
     __versioned__ = True
-    __version_exclude__ = {"created_at", "updated_at", "created_by", "updated_by", "lock_version"}
+    __version_exclude__ = {"created_at", "updated_at", "created_by", "updated_by", "lock_version", "external_key"}
+    # Snapshot list fields built from relationships: field -> (relationship, attribute), sorted.
+    __version_collections__ = {}
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -50,6 +56,7 @@ class Signal(db.Model, VersionedMixin, SoftDeleteMixin):
     frequency_to = db.Column(db.Float, nullable=False)
     modulation = db.Column(db.String(50), nullable=False)
     power = db.Column(db.Float, nullable=False)
+    external_key = db.Column(db.String(128), nullable=True, unique=True, index=True)  # set by `flask import`
 
     assets = db.relationship(
         "Asset",
@@ -67,9 +74,15 @@ class Signal(db.Model, VersionedMixin, SoftDeleteMixin):
 
 class Asset(db.Model, VersionedMixin, SoftDeleteMixin):
     __tablename__ = "assets"
+    __table_args__ = (
+        # Search on MySQL; SQLite uses the FTS5 table from search.py instead.
+        db.Index("ix_assets_fulltext", "name", "description", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=False)
+    external_key = db.Column(db.String(128), nullable=True, unique=True, index=True)  # set by `flask import`
+    __version_collections__ = {"signal_ids": ("signals", "id")}
 
     signals = db.relationship(
         "Signal",
@@ -78,16 +91,19 @@ class Asset(db.Model, VersionedMixin, SoftDeleteMixin):
         lazy="select",
     )
 
-    def __version_snapshot__(self):
-        data = _serialize_columns(self)
-        data["signal_ids"] = sorted(signal.id for signal in self.signals)
-        return data
+    @property
+    def signal_ids(self):
+        return sorted(signal.id for signal in self.signals)
 
 
 class EntityVersion(db.Model):
     __tablename__ = "entity_versions"
     __table_args__ = (
         db.Index("ix_entity_versions_lookup", "entity_type", "entity_id", "version"),
+        # Changes feed: newest first, optionally per user or per entity type (keyset on changed_at, id).
+        db.Index("ix_entity_versions_changed_at", "changed_at"),
+        db.Index("ix_entity_versions_changed_by_changed_at", "changed_by", "changed_at"),
+        db.Index("ix_entity_versions_entity_type_changed_at", "entity_type", "changed_at"),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -98,8 +114,63 @@ class EntityVersion(db.Model):
     snapshot = db.Column(db.JSON, nullable=False)
     diff = db.Column(db.JSON, nullable=False, default=dict)
     hash = db.Column(db.String(64), nullable=False)
+    chain_hash = db.Column(db.String(64), nullable=True)
+    summary = db.Column(db.JSON, nullable=True)  # "field: old → new" lines for the changes feed
     changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     changed_by = db.Column(db.String(64))
+    # The entity's lock_version after this change (what clients send back); NULL on rows written
+    # before it was stored. Versions and lock versions drift apart, so merges look bases up here.
+    lock_version = db.Column(db.Integer, nullable=True)
+
+
+class HistoryCheckpoint(db.Model):
+    """Merkle root over the entity_versions rows with ids first_id..last_id."""
+    __tablename__ = "history_checkpoints"
+
+    id = db.Column(db.Integer, primary_key=True)
+    first_id = db.Column(db.Integer, nullable=False)
+    last_id = db.Column(db.Integer, nullable=False, unique=True)
+    leaf_count = db.Column(db.Integer, nullable=False)
+    root = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ActivityRollup(db.Model):
+    """Count of history rows per time bucket ("hour" or "day"), entity type, operation and user."""
+    __tablename__ = "activity_rollups"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "bucket", "bucket_start", "entity_type", "operation", "changed_by", name="uq_activity_rollups_key"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.String(8), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    entity_type = db.Column(db.String(128), nullable=False)
+    operation = db.Column(db.String(16), nullable=False)
+    changed_by = db.Column(db.String(64), nullable=False, default="")  # "" when unknown
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ActivityRollupState(db.Model):
+    """High-water mark of the rollup job: history rows with id <= last_version_id are counted."""
+    __tablename__ = "activity_rollup_state"
+
+    id = db.Column(db.Integer, primary_key=True)  # a single row, id 1
+    last_version_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RevokedToken(db.Model):
+    """A logged-out access token's `jti`, rejected by every API process until `expires_at` (UTC)."""
+    __tablename__ = "revoked_tokens"
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 
 def _json_value(value):
     if isinstance(value, datetime):
@@ -107,21 +178,82 @@ def _json_value(value):
     return value
 
 
+class VersionedModel:
+    """Versioning metadata of one model class, computed once when its mapper is configured.
+
+    `columns` are the snapshot columns in table order (without `__version_exclude__`) and
+    `collections` the list fields from `__version_collections__`. The serializers read all
+    columns with one `attrgetter` call and only convert the DateTime ones.
+    """
+
+    def __init__(self, model):
+        exclude = set(model.__version_exclude__)
+        table_columns = [column for column in model.__table__.columns if column.name not in exclude]
+        self.model = model
+        self.entity_type = model.__tablename__
+        self.columns = tuple(column.name for column in table_columns)
+        self.collections = tuple(
+            (field, attrgetter(relationship), attrgetter(attribute))
+            for field, (relationship, attribute) in model.__version_collections__.items()
+        )
+        self._datetimes = tuple(column.name for column in table_columns if isinstance(column.type, DateTime))
+        getter = attrgetter(*self.columns)
+        self._values = getter if len(self.columns) > 1 else lambda entity: (getter(entity),)
+
+    def _convert(self, data):
+        for name in self._datetimes:
+            if data[name] is not None:
+                data[name] = _json_value(data[name])
+        return data
+
+    def serialize_columns(self, entity):
+        return self._convert(dict(zip(self.columns, self._values(entity))))
+
+    def serialize(self, entity):
+        data = self.serialize_columns(entity)
+        for field, items, key in self.collections:
+            data[field] = sorted(map(key, items(entity)))
+        return data
+
+    def serialize_row(self, row):
+        return self._convert({name: row[name] for name in self.columns})
+
+
+# Versioned model class -> VersionedModel, and entity type (table name) -> VersionedModel.
+versioned_models = {}
+versioned_types = {}
+
+
+@event.listens_for(VersionedMixin, "mapper_configured", propagate=True)
+def _register_versioned_model(mapper, model):
+    if model.__versioned__:
+        info = VersionedModel(model)
+        versioned_models[model] = info
+        versioned_types[info.entity_type] = info
+
+
+def versioned_info(model):
+    """VersionedModel of a model class (Core-only paths may run before mappers are configured)."""
+    info = versioned_models.get(model)
+    if info is None:
+        configure_mappers()
+        info = versioned_models[model]
+    return info
+
+
+def versioned_model(entity_type):
+    """Model class of a versioned entity type ("signals", "assets"), or None."""
+    configure_mappers()
+    info = versioned_types.get(entity_type)
+    return info.model if info else None
+
+
 def _serialize_columns(entity):
-    exclude = set(getattr(entity, "__version_exclude__", set()))
-    data = {}
-    for column in entity.__table__.columns:
-        if column.name in exclude:
-            continue
-        data[column.name] = _json_value(getattr(entity, column.name))
-    return data
+    return versioned_models[type(entity)].serialize_columns(entity)
 
 
 def _serialize_entity(entity):
-    custom_serializer = getattr(entity, "__version_snapshot__", None)
-    if callable(custom_serializer):
-        return custom_serializer()
-    return _serialize_columns(entity)
+    return versioned_models[type(entity)].serialize(entity)
 
 
 def _calculate_hash(data):
@@ -129,6 +261,42 @@ def _calculate_hash(data):
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
+def _chain_hash(previous_chain_hash, snapshot_hash):
+    """Hash linking a version to its predecessor; the first version chains from ""."""
+    payload = f"{previous_chain_hash or ''}{snapshot_hash}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _format_change_value(value):
+    if value is None:
+        return "—"
+    return str(value)
+
+
+def _change_summary(operation, snapshot, diff):
+    """Human-readable `what_changed` lines, computed once when the version is written."""
+    lines = []
+    if operation == "update" and diff:
+        for key, pair in diff.items():
+            if isinstance(pair, dict) and "old" in pair and "new" in pair:
+                old_s = _format_change_value(pair["old"])
+                new_s = _format_change_value(pair["new"])
+                if old_s != new_s:
+                    lines.append(f"{key}: {old_s} → {new_s}")
+            elif isinstance(pair, dict) and ("added" in pair or "removed" in pair):
+                # Membership delta written by bulk.bulk_membership.
+                parts = [f"+{pair['added']}" if pair.get("added") else "", f"-{pair['removed']}" if pair.get("removed") else ""]
+                lines.append(f"{key}: {' '.join(part for part in parts if part)}")
+    elif operation == "create" and snapshot:
+        for key, val in snapshot.items():
+            new_s = _format_change_value(val)
+            if new_s != "—":
+                lines.append(f"{key}: — → {new_s}")
+    elif operation == "delete":
+        lines.append("—")
+    return lines
+
+
 def _diff_snapshots(old_snapshot, new_snapshot):
     diff = {}
     keys = set(old_snapshot.keys()) | set(new_snapshot.keys())
@@ -143,37 +311,129 @@ def _diff_snapshots(old_snapshot, new_snapshot):
 def _compute_diff(entity):
     mapper_state = inspect(entity)
     diff = {}
-    exclude = set(getattr(entity, "__version_exclude__", set()))
-    for column in entity.__table__.columns:
-        if column.name in exclude:
-            continue
-        attr = mapper_state.attrs[column.name]
-        history = attr.history
+    for name in versioned_models[type(entity)].columns:
+        history = mapper_state.attrs[name].history
         if history.has_changes():
             old_value = _json_value(history.deleted[0]) if history.deleted else None
-            new_value = _json_value(history.added[0]) if history.added else _json_value(getattr(entity, column.name))
-            diff[column.name] = {"old": old_value, "new": new_value}
+            new_value = _json_value(history.added[0]) if history.added else _json_value(getattr(entity, name))
+            diff[name] = {"old": old_value, "new": new_value}
     return diff
 
 
-def _get_last_snapshot(session, entity_type, entity_id):
-    previous_version = (
-        session.query(EntityVersion)
-        .filter_by(entity_type=entity_type, entity_id=entity_id)
-        .order_by(EntityVersion.version.desc())
-        .first()
+def _serialize_row(model, row):
+    """Snapshot columns of a Core result row (mapping) for `model`, like `_serialize_columns`."""
+    return versioned_info(model).serialize_row(row)
+
+
+def _latest_versions(session, entity_type, entity_ids):
+    """Newest history row per entity as {entity_id: (version, snapshot, chain_hash)}, in one query."""
+    if not entity_ids:
+        return {}
+    latest = (
+        select(EntityVersion.entity_id, func.max(EntityVersion.version).label("version"))
+        .where(EntityVersion.entity_type == entity_type, EntityVersion.entity_id.in_(entity_ids))
+        .group_by(EntityVersion.entity_id)
+        .subquery()
+    )
+    rows = session.execute(
+        select(
+            EntityVersion.entity_id, EntityVersion.version, EntityVersion.snapshot, EntityVersion.chain_hash
+        ).join(
+            latest,
+            (EntityVersion.entity_id == latest.c.entity_id) & (EntityVersion.version == latest.c.version),
+        ).where(EntityVersion.entity_type == entity_type)
     )
-    if previous_version:
-        return previous_version.snapshot or {}
-    return None
+    return {row.entity_id: (row.version, row.snapshot or {}, row.chain_hash) for row in rows}
+
+
+def _previous_versions(session, entities):
+    """`_latest_versions` for flushed entities, keyed by (entity_type, entity_id); one query per type."""
+    ids = {}
+    for entity in entities:
+        ids.setdefault(versioned_models[type(entity)].entity_type, set()).add(entity.id)
+    return {
+        (entity_type, entity_id): latest
+        for entity_type, type_ids in ids.items()
+        for entity_id, latest in _latest_versions(session, entity_type, sorted(type_ids)).items()
+    }
+
+
+def _version_values(entity_type, entity_id, version, operation, snapshot, diff, changed_by, changed_at=None,
+                    previous_chain_hash=None, lock_version=None):
+    """Column values for one EntityVersion row; `lock_version` is the entity's after the change."""
+    snapshot_hash = _calculate_hash(snapshot)
+    return {
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "version": version,
+        "operation": operation,
+        "snapshot": snapshot,
+        "diff": diff,
+        "hash": snapshot_hash,
+        "chain_hash": _chain_hash(previous_chain_hash, snapshot_hash),
+        "summary": _change_summary(operation, snapshot, diff),
+        "changed_at": changed_at or datetime.utcnow(),
+        "changed_by": changed_by,
+        "lock_version": lock_version,
+    }
+
+
+# Callbacks `hook(connection, rows)` run after history rows are written, with the
+# `_version_values` dicts; both the flush listener and the Core bulk paths call them, inside
+# the same transaction. Register with `@on_versions_written`.
+version_hooks = []
+
+
+def on_versions_written(hook):
+    version_hooks.append(hook)
+    return hook
+
+
+def _run_version_hooks(session, rows):
+    if rows and version_hooks:
+        connection = session.connection()
+        for hook in version_hooks:
+            hook(connection, rows)
+
+
+def _insert_versions(session, rows):
+    """Insert prepared `_version_values` rows with a single executemany."""
+    if rows:
+        session.execute(EntityVersion.__table__.insert(), rows)
+        _run_version_hooks(session, rows)
+
+
+class VersionBatch:
+    """History rows of several Core writes in one transaction, inserted together by `flush`.
+
+    `previous` returns (version, snapshot, chain_hash) of an entity's newest history row,
+    including rows added to the batch but not inserted yet, so two writes to the same entity
+    in one batch get consecutive versions.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self._latest = {}
+
+    def previous(self, session, entity_type, entity_id):
+        key = (entity_type, entity_id)
+        if key not in self._latest:
+            self._latest[key] = _latest_versions(session, entity_type, [entity_id]).get(entity_id)
+        return self._latest[key]
+
+    def add(self, values):
+        self.rows.append(values)
+        self._latest[(values["entity_type"], values["entity_id"])] = (
+            values["version"], values["snapshot"], values["chain_hash"]
+        )
+
+    def flush(self, session):
+        _insert_versions(session, self.rows)
+        self.rows = []
 
 
 def _is_versioned_entity(entity):
-    return (
-        hasattr(entity, "__table__")
-        and getattr(entity, "__versioned__", False)
-        and not isinstance(entity, EntityVersion)
-    )
+    return type(entity) in versioned_models
 
 
 class OptimisticLockError(Exception):
@@ -194,30 +454,26 @@ def collect_version_events(session, flush_context, instances):
                     entity.updated_by = actor
             events.append((entity, "create", {}))
 
-    for entity in session.dirty:
-        if _is_versioned_entity(entity) and session.is_modified(entity, include_collections=True):
-            if getattr(entity, "id", None) is None:
-                continue
-
-            current_snapshot = _serialize_entity(entity)
-            previous_snapshot = _get_last_snapshot(session, entity.__tablename__, entity.id)
-
-            if previous_snapshot is not None:
-                snapshot_diff = _diff_snapshots(previous_snapshot, current_snapshot)
-                if not snapshot_diff:
-                    continue
-                entity.updated_at = datetime.utcnow()
-                if actor:
-                    entity.updated_by = actor
-                events.append((entity, "update", snapshot_diff))
-            else:
-                column_diff = _compute_diff(entity)
-                if not column_diff:
-                    continue
-                entity.updated_at = datetime.utcnow()
-                if actor:
-                    entity.updated_by = actor
-                events.append((entity, "update", column_diff))
+    dirty = [
+        entity for entity in session.dirty
+        if _is_versioned_entity(entity)
+        and getattr(entity, "id", None) is not None
+        and session.is_modified(entity, include_collections=True)
+    ]
+    previous = _previous_versions(session, dirty)
+    for entity in dirty:
+        info = versioned_models[type(entity)]
+        latest = previous.get((info.entity_type, entity.id))
+        if latest is not None:
+            diff = _diff_snapshots(latest[1], info.serialize(entity))
+        else:
+            diff = _compute_diff(entity)
+        if not diff:
+            continue
+        entity.updated_at = datetime.utcnow()
+        if actor:
+            entity.updated_by = actor
+        events.append((entity, "update", diff))
 
     for entity in session.deleted:
         if _is_versioned_entity(entity):
@@ -226,29 +482,27 @@ def collect_version_events(session, flush_context, instances):
 
 @event.listens_for(db.session.__class__, "after_flush_postexec")
 def create_entity_versions(session, flush_context):
-    events = session.info.pop("version_events", [])
+    events = [item for item in session.info.pop("version_events", []) if getattr(item[0], "id", None) is not None]
+    previous = _previous_versions(session, [entity for entity, _, _ in events])
+    written = []
     for entity, operation, diff in events:
-        entity_id = getattr(entity, "id", None)
-        if entity_id is None:
-            continue
-
-        entity_type = entity.__tablename__
-        current_version = (
-            session.query(func.max(EntityVersion.version))
-            .filter_by(entity_type=entity_type, entity_id=entity_id)
-            .scalar()
-        ) or 0
-
-        snapshot = _serialize_entity(entity)
-
-        version_row = EntityVersion(
-            entity_type=entity_type,
-            entity_id=entity_id,
-            version=current_version + 1,
-            operation=operation,
-            snapshot=snapshot,
-            diff=diff,
-            hash=_calculate_hash(snapshot),
-            changed_by=getattr(entity, "updated_by", None),
+        info = versioned_models[type(entity)]
+        entity_type, entity_id = info.entity_type, entity.id
+        current_version, _, previous_chain_hash = previous.get((entity_type, entity_id), (0, None, None))
+
+        snapshot = info.serialize(entity)
+
+        values = _version_values(
+            entity_type,
+            entity_id,
+            current_version + 1,
+            operation,
+            snapshot,
+            diff,
+            getattr(entity, "updated_by", None),
+            previous_chain_hash=previous_chain_hash,
+            lock_version=entity.lock_version,
         )
-        session.add(version_row)
+        session.add(EntityVersion(**values))
+        written.append(values)
+    _run_version_hooks(session, written)
@@ -0,0 +1,138 @@
+"""Helpers for changing large tables in Alembic migrations without blocking writers.
+
+A column change is split into three steps (expand / backfill / contract):
+
+1. expand: add the new column nullable, without a table rebuild (`add_column_if_missing`).
+   On MySQL 8 a nullable `ADD COLUMN` is an instant metadata change; on SQLite it is a plain
+   `ALTER TABLE ... ADD COLUMN`. Code deployed from here on writes both old and new columns.
+2. backfill: copy the data in primary-key ranges with `chunked_backfill`, one short
+   transaction per range, so row locks are held for one chunk at a time. Progress is stored
+   in `migration_backfill_progress`, so a migration that was interrupted (or killed because
+   replication lagged) continues where it stopped when `db upgrade` runs again. The table
+   is dropped once no backfill is in progress.
+3. contract: once no running code reads the old column, tighten the new one (NOT NULL,
+   constraints) and drop the old one. This is the only step that may rebuild the table, so it
+   is always a separate, later revision, shipped after the code change.
+
+Chunk size and pause can be tuned per run without editing migrations:
+
+    MIGRATION_BACKFILL_BATCH_SIZE=5000 MIGRATION_BACKFILL_PAUSE=0.2 flask --app app/app.py db upgrade
+
+In offline mode (`db upgrade --sql`) the backfill is emitted as a single UPDATE.
+"""
+import logging
+import os
+import time
+
+from alembic import context, op
+import sqlalchemy as sa
+
+PROGRESS_TABLE = "migration_backfill_progress"
+BACKFILL_BATCH_SIZE = 1000
+BACKFILL_PAUSE = 0.0
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+_progress = sa.table(
+    PROGRESS_TABLE,
+    sa.column("name", sa.String),
+    sa.column("last_pk", sa.Integer),
+    sa.column("updated_at", sa.DateTime),
+)
+
+
+def add_column_if_missing(table, column):
+    """Expand step: `op.add_column` unless the column exists (the upgrade may be re-run)."""
+    if not context.is_offline_mode():
+        existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+        if column.name in existing:
+            return
+    op.add_column(table, column)
+
+
+def _ensure_progress_table(connection):
+    if not sa.inspect(connection).has_table(PROGRESS_TABLE):
+        sa.Table(
+            PROGRESS_TABLE,
+            sa.MetaData(),
+            sa.Column("name", sa.String(128), primary_key=True),
+            sa.Column("last_pk", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        ).create(connection)
+
+
+def _save_progress(connection, name, last_pk, known):
+    values = {"last_pk": last_pk, "updated_at": sa.func.current_timestamp()}
+    if known:
+        connection.execute(_progress.update().where(_progress.c.name == name).values(**values))
+    else:
+        connection.execute(_progress.insert().values(name=name, **values))
+
+
+def _assignments(values):
+    return ", ".join(f"{column} = {expression}" for column, expression in values.items())
+
+
+def chunked_ranges(name, table, pk="id", batch_size=None, pause=None, log=None):
+    """Yield (connection, low, high) for every primary-key range [low, high) of `table`.
+
+    The caller runs its statements for a range on `connection`; each range commits on its own
+    (outside the migration's transaction) and is followed by `pause` seconds of sleep to let
+    replicas catch up. `name` identifies the run in the progress table, so a re-run resumes
+    after the last finished range. Online mode only.
+    """
+    batch_size = batch_size or int(os.environ.get("MIGRATION_BACKFILL_BATCH_SIZE", BACKFILL_BATCH_SIZE))
+    pause = float(os.environ.get("MIGRATION_BACKFILL_PAUSE", BACKFILL_PAUSE)) if pause is None else pause
+    log = log or logger.info
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        low, high_pk = connection.execute(sa.text(f"SELECT MIN({pk}), MAX({pk}) FROM {table}")).one()
+        if high_pk is None:
+            return
+        _ensure_progress_table(connection)
+        last_pk = connection.execute(
+            sa.select(_progress.c.last_pk).where(_progress.c.name == name)
+        ).scalar()
+        known = last_pk is not None
+        first = low
+        if known:
+            low = max(low, last_pk)
+            log(f"{name}: resuming at {table}.{pk} {low}")
+        started = time.monotonic()
+        while low <= high_pk:
+            high = low + batch_size
+            yield connection, low, high
+            _save_progress(connection, name, high, known)
+            known = True
+            done = min(high, high_pk + 1) - first
+            log(f"{name}: {table}.{pk} < {high} "
+                f"({100 * done / (high_pk + 1 - first):.0f}%, {time.monotonic() - started:.1f}s)")
+            low = high
+            if pause and low <= high_pk:
+                time.sleep(pause)
+        connection.execute(_progress.delete().where(_progress.c.name == name))
+        if connection.execute(sa.select(sa.func.count()).select_from(_progress)).scalar() == 0:
+            connection.execute(sa.text(f"DROP TABLE {PROGRESS_TABLE}"))
+
+
+def chunked_backfill(name, table, values, where=None, pk="id", batch_size=None, pause=None, log=None):
+    """Backfill step: `UPDATE table SET values` over `chunked_ranges` of the primary key.
+
+    `values` maps column -> SQL expression (`{"frequency_from": "frequency"}`), `where` is an
+    optional extra SQL condition. Re-running a range is harmless because the assignments are
+    deterministic. Progress goes to the alembic logger unless `log` is given. Returns the
+    number of rows updated.
+    """
+    condition = f" AND ({where})" if where else ""
+    if context.is_offline_mode():
+        op.execute(f"UPDATE {table} SET {_assignments(values)}{' WHERE ' + where if where else ''}")
+        return 0
+
+    statement = sa.text(
+        f"UPDATE {table} SET {_assignments(values)} WHERE {pk} >= :low AND {pk} < :high{condition}"
+    )
+    updated = 0
+    for connection, low, high in chunked_ranges(name, table, pk, batch_size, pause, log):
+        updated += connection.execute(statement, {"low": low, "high": high}).rowcount
+    (log or logger.info)(f"{name}: {updated} rows updated")
+    return updated
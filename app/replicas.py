@@ -0,0 +1,108 @@
+"""Read-replica routing: read-only API requests query the `replica` bind, everything else the primary.
+
+`SQLALCHEMY_BINDS["replica"]` (from `REPLICA_DATABASE_URL`) is an extra engine over the same
+schema. A request is routed to it only when all of these hold:
+
+- it is a GET/HEAD request under `/api`;
+- the client has not committed a write within the last `REPLICA_STICKY_SECONDS`. A successful
+  commit sets the `read_primary` cookie and returns an `X-Last-Write` header (epoch seconds of
+  the write); clients that do not keep cookies (API clients, fetch without credentials) echo
+  that header on their next requests. Either one keeps the client on the primary while the
+  replica catches up (read-your-writes);
+- the session has not flushed in this request; the first flush pins the session to the primary.
+
+Without a replica bind every request uses the primary, so the feature is off by default.
+
+    flask --app app/app.py replica sync    # SQLite only: copy the primary file onto the replica
+"""
+import sqlite3
+import time
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = "replica"
+STICKY_COOKIE = "read_primary"
+LAST_WRITE_HEADER = "X-Last-Write"
+READ_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads to the replica while `info["use_replica"]` is set."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get("use_replica"):
+            if self._flushing:
+                self.info["use_replica"] = False
+            else:
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_commit(session):
+    session.info["committed"] = True
+
+
+def replica_configured(app=None):
+    app = app or current_app
+    return REPLICA_BIND in (app.config.get("SQLALCHEMY_BINDS") or {})
+
+
+def wrote_recently(cookies, headers, sticky_seconds):
+    """True if the request carries the sticky cookie or an `X-Last-Write` younger than `sticky_seconds`."""
+    if cookies.get(STICKY_COOKIE):
+        return True
+    try:
+        last_write = float(headers.get(LAST_WRITE_HEADER) or 0)
+    except ValueError:
+        return False
+    return time.time() - last_write < sticky_seconds
+
+
+def route_request(session):
+    """before_request: use the replica for reads unless the client is sticky to the primary."""
+    if (
+        request.method in READ_METHODS
+        and replica_configured()
+        and not wrote_recently(request.cookies, request.headers, current_app.config["REPLICA_STICKY_SECONDS"])
+    ):
+        session.info["use_replica"] = True
+
+
+def mark_sticky(session, response):
+    """after_request: pin the client to the primary for a while after it committed a write."""
+    if session.info.get("committed") and replica_configured() and response.status_code < 400:
+        response.set_cookie(
+            STICKY_COOKIE, "1",
+            max_age=current_app.config["REPLICA_STICKY_SECONDS"],
+            httponly=True, samesite="Lax",
+        )
+        response.headers[LAST_WRITE_HEADER] = f"{time.time():.3f}"
+    return response
+
+
+replica_cli = AppGroup("replica", help="Read-replica commands.")
+
+
+@replica_cli.command("sync")
+def sync_command():
+    """Copy the primary SQLite database onto the replica (for testing routing locally)."""
+    db = current_app.extensions["sqlalchemy"]
+    primary = db.engines[None]
+    replica = db.engines.get(REPLICA_BIND)
+    if replica is None:
+        raise click.ClickException("No replica bind configured (set REPLICA_DATABASE_URL).")
+    if primary.dialect.name != "sqlite" or replica.dialect.name != "sqlite":
+        raise click.ClickException("replica sync only copies SQLite files; use database replication otherwise.")
+    source = sqlite3.connect(primary.url.database)
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    click.echo(f"copied {primary.url.database} -> {replica.url.database}")
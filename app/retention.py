@@ -0,0 +1,168 @@
+"""Trash retention: hard-delete entities that have been soft-deleted for longer than a period.
+
+Each chunk is its own short transaction: lock up to `chunk_size` expired rows (skipping rows
+locked by other transactions), write a final "delete" history row per entity, drop their
+`asset_signals` links (recording the membership change on the affected assets) and delete
+the rows. The job sleeps `pause` seconds between chunks so it can run during business hours.
+
+    flask --app app/app.py trash purge --days 30 --chunk-size 200 --pause 0.5
+    flask --app app/app.py trash purge --loop --interval 3600
+"""
+from datetime import datetime, timedelta
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select
+
+from bulk import _bump_locked
+from history import evict_entities
+
+from models import (
+    Asset,
+    Signal,
+    _diff_snapshots,
+    _insert_versions,
+    _latest_versions,
+    _serialize_row,
+    _version_values,
+    asset_signals,
+    db,
+)
+
+PURGE_ACTOR = "system"
+
+
+def _record_unlinked_signals(session, links, actor, now):
+    """History + lock_version bump for assets losing links to purged signals.
+
+    The assets are locked and bumped only from the lock_version just read. Assets without a
+    history row are skipped: without a previous snapshot there is no membership to diff.
+    """
+    removed = {}
+    for asset_id, signal_id in links:
+        removed.setdefault(asset_id, set()).add(signal_id)
+    assets = Asset.__table__
+    previous = _latest_versions(session, assets.name, sorted(removed))
+    rows = session.execute(
+        select(assets.c.id, assets.c.lock_version)
+        .where(assets.c.id.in_(sorted(previous)))
+        .order_by(assets.c.id)
+        .with_for_update()
+    ).all()
+    by_lock_version = {}
+    locks = {row.id: row.lock_version for row in rows}
+    for row in rows:
+        by_lock_version.setdefault(row.lock_version, []).append(row.id)
+
+    version_rows = []
+    for asset_id in _bump_locked(session, assets, by_lock_version, now, actor):
+        version, old_snapshot, chain_hash = previous[asset_id]
+        snapshot = dict(old_snapshot)
+        if "signal_ids" in snapshot:
+            snapshot["signal_ids"] = [sid for sid in snapshot["signal_ids"] if sid not in removed[asset_id]]
+        version_rows.append(_version_values(
+            assets.name, asset_id, version + 1, "update", snapshot,
+            _diff_snapshots(old_snapshot, snapshot), actor, now, previous_chain_hash=chain_hash,
+            lock_version=locks[asset_id] + 1,
+        ))
+    _insert_versions(session, version_rows)
+
+
+def _purge_chunk(session, model, cutoff, chunk_size, actor):
+    table = model.__table__
+    # The highest id is never purged: SQLite (no AUTOINCREMENT) and MySQL before 8.0 (after a
+    # restart) would hand it out again, and the new entity would continue the old one's history.
+    newest_id = select(func.max(table.c.id)).scalar_subquery()
+    rows = session.execute(
+        select(table)
+        .where(table.c.is_deleted.is_(True), table.c.deleted_at < cutoff, table.c.id < newest_id)
+        .order_by(table.c.id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+    ).mappings().all()
+    if not rows:
+        return []
+    ids = [row["id"] for row in rows]
+    now = datetime.utcnow()
+
+    previous = _latest_versions(session, table.name, ids)
+    version_rows = []
+    for row in rows:
+        version, snapshot, chain_hash = previous.get(row["id"], (0, None, None))
+        if snapshot is None:
+            snapshot = _serialize_row(model, row)
+        version_rows.append(_version_values(
+            table.name, row["id"], version + 1, "delete", snapshot, {}, actor, now, previous_chain_hash=chain_hash,
+            lock_version=row["lock_version"],
+        ))
+    _insert_versions(session, version_rows)
+
+    if model is Signal:
+        links = session.execute(
+            select(asset_signals.c.asset_id, asset_signals.c.signal_id).where(asset_signals.c.signal_id.in_(ids))
+        ).all()
+        if links:
+            _record_unlinked_signals(session, links, actor, now)
+        session.execute(delete(asset_signals).where(asset_signals.c.signal_id.in_(ids)))
+    else:
+        session.execute(delete(asset_signals).where(asset_signals.c.asset_id.in_(ids)))
+
+    session.execute(delete(table).where(table.c.id.in_(ids), table.c.is_deleted.is_(True)))
+    return ids
+
+
+def purge_deleted(session, model, older_than, chunk_size=200, pause=0.0, max_chunks=None, actor=PURGE_ACTOR, log=None):
+    """Hard-delete `model` rows soft-deleted before now - `older_than`; returns the number purged."""
+    cutoff = datetime.utcnow() - older_than
+    total = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        try:
+            purged_ids = _purge_chunk(session, model, cutoff, chunk_size, actor)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        if not purged_ids:
+            break
+        evict_entities(model.__tablename__, purged_ids)
+        purged = len(purged_ids)
+        total += purged
+        chunks += 1
+        if log:
+            log(f"{model.__tablename__}: purged {purged} (total {total})")
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+trash_cli = AppGroup("trash", help="Trash retention commands.")
+
+
+@trash_cli.command("purge")
+@click.option("--days", type=float, default=None, help="Retention period (default TRASH_RETENTION_DAYS).")
+@click.option("--chunk-size", type=int, default=None, help="Rows per transaction (default TRASH_PURGE_CHUNK_SIZE).")
+@click.option("--pause", type=float, default=None, help="Seconds between chunks (default TRASH_PURGE_PAUSE).")
+@click.option("--max-chunks", type=int, default=None, help="Stop after this many chunks per entity type.")
+@click.option("--loop", is_flag=True, help="Keep running, one purge pass every --interval seconds.")
+@click.option("--interval", type=float, default=None, help="Seconds between passes with --loop (default TRASH_PURGE_INTERVAL).")
+def purge_command(days, chunk_size, pause, max_chunks, loop, interval):
+    """Hard-delete signals and assets that have been in the trash longer than the retention period."""
+    config = current_app.config
+    older_than = timedelta(days=days if days is not None else config["TRASH_RETENTION_DAYS"])
+    chunk_size = chunk_size or config["TRASH_PURGE_CHUNK_SIZE"]
+    pause = pause if pause is not None else config["TRASH_PURGE_PAUSE"]
+    interval = interval if interval is not None else config["TRASH_PURGE_INTERVAL"]
+    while True:
+        # Assets first: purging them drops their links, so fewer live assets change when signals go.
+        for model in (Asset, Signal):
+            total = purge_deleted(
+                db.session, model, older_than, chunk_size=chunk_size, pause=pause,
+                max_chunks=max_chunks, log=click.echo,
+            )
+            click.echo(f"{model.__tablename__}: {total} purged")
+        if not loop:
+            break
+        time.sleep(interval)
@@ -1,9 +1,10 @@
 """Pydantic request/response schemas and base types."""
 from __future__ import annotations
 
-from typing import Any
+from datetime import datetime
+from typing import Any, Literal
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 # --- Base ---
@@ -24,6 +25,12 @@ class ErrorResponse(BaseResponse):
     error: str
 
 
+class MergeConflictResponse(ErrorResponse):
+    """409 for a merge-mode PATCH: fields changed both by the client and since its base version."""
+    conflicts: list[str]
+    lock_version: int
+
+
 # --- Auth ---
 
 
@@ -69,6 +76,7 @@ class SignalUpdateRequest(BaseRequest):
     modulation: str | None = None
     power: float | None = None
     lock_version: int = 0
+    merge: bool = False  # rebase a stale lock_version onto the current version (merge.py)
 
     @model_validator(mode="after")
     def frequency_range_order(self):
@@ -104,6 +112,7 @@ class AssetUpdateRequest(BaseRequest):
     description: str | None = None
     signal_ids: list[int] | None = None
     lock_version: int = 0
+    merge: bool = False  # rebase a stale lock_version onto the current version (merge.py)
 
 
 class AssetResponse(BaseResponse):
@@ -117,6 +126,79 @@ class AssetResponse(BaseResponse):
     updated: bool | None = None  # only on PATCH
 
 
+# --- Bulk operations ---
+
+
+class BulkItemRequest(BaseRequest):
+    """Entity id plus the lock_version the client last saw."""
+    id: int
+    lock_version: int
+
+
+class SignalBulkUpdateRequest(BaseRequest):
+    """Set the given fields on every listed signal."""
+    items: list[BulkItemRequest] = Field(..., min_length=1)
+    frequency_from: float | None = None
+    frequency_to: float | None = None
+    modulation: str | None = None
+    power: float | None = None
+
+    @model_validator(mode="after")
+    def frequency_range_order(self):
+        if (self.frequency_from is None) != (self.frequency_to is None):
+            raise ValueError("frequency_from and frequency_to must be set together in bulk updates")
+        if self.frequency_from is not None and self.frequency_to < self.frequency_from:
+            raise ValueError("frequency_to must be >= frequency_from")
+        return self
+
+
+class AssetBulkUpdateRequest(BaseRequest):
+    """Set the given fields on every listed asset (membership is not part of bulk updates)."""
+    items: list[BulkItemRequest] = Field(..., min_length=1)
+    name: str | None = None
+    description: str | None = None
+
+
+class AssetMembershipRequest(BaseRequest):
+    """Link `add` to and unlink `remove` from every listed asset."""
+    items: list[BulkItemRequest] = Field(..., min_length=1)
+    add: list[int] = Field(default_factory=list)
+    remove: list[int] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def disjoint_changes(self):
+        if not self.add and not self.remove:
+            raise ValueError("add or remove must list signal ids")
+        if set(self.add) & set(self.remove):
+            raise ValueError("a signal id cannot be both added and removed")
+        return self
+
+
+class AssetSignalsRequest(BaseRequest):
+    """Signal ids to link to (POST) or unlink from (DELETE) one asset."""
+    signal_ids: list[int] = Field(..., min_length=1)
+    lock_version: int = 0
+
+
+class AssetMembershipResponse(BaseResponse):
+    """Result of a single-asset link change (the full signal_ids list is not loaded)."""
+    id: int
+    lock_version: int
+    updated: bool
+
+
+class BulkDeleteRequest(BaseRequest):
+    items: list[BulkItemRequest] = Field(..., min_length=1)
+
+
+class BulkResultResponse(BaseResponse):
+    """Outcome per id; `conflicts` had a different lock_version, `not_found` is missing or deleted."""
+    updated: list[int]
+    unchanged: list[int]
+    conflicts: list[int]
+    not_found: list[int]
+
+
 # --- Trash ---
 
 
@@ -128,9 +210,78 @@ class TrashItemResponse(BaseResponse):
     deleted_by: str | None
 
 
+# --- Sync (delta feed) ---
+
+
+class SyncTombstoneResponse(BaseResponse):
+    """Entity that was soft-deleted (or no longer exists) since the cursor."""
+    entity_type: str
+    id: int
+    deleted_at: str | None
+    deleted_by: str | None
+
+
+class SyncResponse(BaseResponse):
+    """One page of the delta feed; pass `cursor` back as `since` for the next page."""
+    signals: list[SignalResponse]
+    assets: list[AssetResponse]
+    tombstones: list[SyncTombstoneResponse]
+    cursor: int
+    has_more: bool
+
+
+class AssetSearchQuery(BaseRequest):
+    """Query string of /api/assets/search."""
+    q: str = Field(..., min_length=1)
+    limit: int = Field(20, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+
+
+class AssetSearchHitResponse(AssetResponse):
+    score: float  # higher is better; 0 on backends without ranking
+
+
+class AssetSearchResponse(BaseResponse):
+    """One page of ranked results; pass `next_offset` as `offset` for the next page."""
+    results: list[AssetSearchHitResponse]
+    next_offset: int | None
+
+
 # --- Changes (global history) ---
 
 
+class ChangesQuery(BaseRequest):
+    """Query string of /api/changes. `cursor` is the X-Next-Cursor header of the previous page."""
+    who: str | None = None
+    entity_type: str | None = None
+    operation: Literal["create", "update", "delete"] | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    limit: int = 100
+    offset: int = 0
+    cursor: tuple[datetime, int] | None = None
+
+    @field_validator("limit", "offset", mode="before")
+    @classmethod
+    def clamp_paging(cls, value, info):
+        """Like the original `request.args.get(type=int)` handling: bad values fall back to the
+        default, limit is clamped to 1..500 and offset to >= 0 instead of being rejected."""
+        default = cls.model_fields[info.field_name].default
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return default
+        return min(max(1, value), 500) if info.field_name == "limit" else max(0, value)
+
+    @field_validator("cursor", mode="before")
+    @classmethod
+    def split_cursor(cls, value):
+        if isinstance(value, str):
+            changed_at, _, row_id = value.rpartition(",")
+            return (changed_at, row_id)
+        return value
+
+
 class ChangeRecordResponse(BaseResponse):
     """Single row for the changes history table."""
     date: str
@@ -141,6 +292,37 @@ class ChangeRecordResponse(BaseResponse):
     what_changed: list[str]
 
 
+# --- Activity rollups ---
+
+
+class ActivityQuery(BaseRequest):
+    """Query string of /api/activity; the range defaults to the last day (hour) or 30 days (day)."""
+    bucket: Literal["hour", "day"] = "hour"
+    since: datetime | None = None
+    until: datetime | None = None
+    entity_type: str | None = None
+    operation: Literal["create", "update", "delete"] | None = None
+    who: str | None = None
+
+
+class ActivityBucketResponse(BaseResponse):
+    bucket_start: str
+    entity_type: str
+    operation: str
+    who: str | None
+    count: int
+
+
+def activity_to_response(rollup) -> dict:
+    return {
+        "bucket_start": rollup.bucket_start.isoformat(),
+        "entity_type": rollup.entity_type,
+        "operation": rollup.operation,
+        "who": rollup.changed_by or None,
+        "count": rollup.count,
+    }
+
+
 # --- Versions ---
 
 
@@ -153,10 +335,47 @@ class VersionResponse(BaseResponse):
     snapshot: dict[str, Any]
     diff: dict[str, Any]
     hash: str
+    chain_hash: str | None
     changed_at: str | None
     changed_by: str | None
 
 
+class VersionDiffResponse(BaseResponse):
+    """Net changes between two versions of one entity (`diff` as in VersionResponse)."""
+    entity_type: str
+    entity_id: int
+    from_version: int
+    to_version: int
+    diff: dict[str, Any]
+
+
+class CheckpointResponse(BaseResponse):
+    """Merkle root over history rows first_id..last_id."""
+    id: int
+    first_id: int
+    last_id: int
+    leaf_count: int
+    root: str
+
+
+class ProofStepResponse(BaseResponse):
+    hash: str
+    side: str  # "left" | "right": where the sibling goes when hashing up
+
+
+class VersionProofResponse(BaseResponse):
+    """Inclusion proof of one version in a history checkpoint."""
+    entity_type: str
+    entity_id: int
+    version: int
+    version_id: int
+    chain_hash: str
+    leaf: str
+    index: int
+    path: list[ProofStepResponse]
+    checkpoint: CheckpointResponse
+
+
 # --- Helpers: build response from ORM ---
 
 
@@ -179,7 +398,7 @@ def asset_to_response(asset, *, updated: bool | None = None) -> dict:
         "id": asset.id,
         "name": asset.name,
         "description": asset.description,
-        "signal_ids": sorted(s.id for s in asset.signals),
+        "signal_ids": asset.signal_ids,
         "created_by": asset.created_by,
         "updated_by": asset.updated_by,
         "lock_version": asset.lock_version,
@@ -187,6 +406,16 @@ def asset_to_response(asset, *, updated: bool | None = None) -> dict:
     }
 
 
+def tombstone_to_response(entity_type: str, entity_id: int, entity=None) -> dict:
+    deleted_at = getattr(entity, "deleted_at", None)
+    return {
+        "entity_type": entity_type,
+        "id": entity_id,
+        "deleted_at": deleted_at.isoformat() if deleted_at else None,
+        "deleted_by": getattr(entity, "deleted_by", None),
+    }
+
+
 def version_to_response(v) -> dict:
     return {
         "id": v.id,
@@ -197,38 +426,21 @@ def version_to_response(v) -> dict:
         "snapshot": v.snapshot,
         "diff": v.diff,
         "hash": v.hash,
+        "chain_hash": v.chain_hash,
         "changed_at": v.changed_at.isoformat() if v.changed_at else None,
         "changed_by": v.changed_by,
     }
 
 
-def _format_change_value(value: Any) -> str:
-    if value is None:
-        return "—"
-    if isinstance(value, (list, tuple)):
-        return str(value)
-    return str(value)
-
+def change_record_to_response(v: "EntityVersion", what_changed: list[str] | None = None) -> dict:
+    """Build a change record for the history table from an EntityVersion (or a narrow row).
 
-def change_record_to_response(v: "EntityVersion") -> dict:
-    """Build a change record for the history table from an EntityVersion."""
+    Uses the stored `summary`; `what_changed` is for rows written before summaries existed.
+    """
     date = v.changed_at.isoformat() if v.changed_at else ""
     who = v.changed_by if v.changed_by else "—"
-    what_changed: list[str] = []
-    if v.operation == "update" and v.diff:
-        for key, pair in v.diff.items():
-            if isinstance(pair, dict) and "old" in pair and "new" in pair:
-                old_s = _format_change_value(pair["old"])
-                new_s = _format_change_value(pair["new"])
-                if old_s != new_s:
-                    what_changed.append(f"{key}: {old_s} → {new_s}")
-    elif v.operation == "create" and v.snapshot:
-        for key, val in v.snapshot.items():
-            new_s = _format_change_value(val)
-            if new_s != "—":
-                what_changed.append(f"{key}: — → {new_s}")
-    elif v.operation == "delete":
-        what_changed.append("—")
+    if what_changed is None:
+        what_changed = v.summary or []
     return {
         "date": date,
         "who": who,
@@ -0,0 +1,144 @@
+"""Full-text search over asset names and descriptions.
+
+Backends, by dialect of the engine serving the query:
+
+- MySQL: a `FULLTEXT(name, description)` index, maintained by InnoDB; queries use
+  `MATCH ... AGAINST` in boolean mode.
+- SQLite: an FTS5 table `assets_fts` (rowid = asset id). It is kept up to date from the
+  history writes (`on_versions_written`), so the flush listener, bulk updates and trash
+  purge all update it in the same transaction as the change. Ranked by bm25 with name
+  matches weighted above description matches.
+- anything else: `LIKE` on both columns, unranked.
+
+Every search word must match, as a prefix ("ant" finds "antenna"). Soft-deleted assets stay
+in the index and are filtered out by the join, so restoring one needs no reindex.
+
+    flask --app app/app.py search rebuild    # SQLite: repopulate assets_fts from assets
+"""
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DDL, event, text
+
+from models import Asset, db, on_versions_written
+
+FTS_TABLE = "assets_fts"
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+INDEXED_FIELDS = ("name", "description")
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+event.listen(
+    Asset.__table__,
+    "after_create",
+    DDL(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, description)").execute_if(dialect="sqlite"),
+)
+event.listen(
+    Asset.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"),
+)
+
+
+def search_words(query):
+    return _WORD.findall(query or "")
+
+
+@on_versions_written
+def _index_asset_versions(connection, rows):
+    if connection.dialect.name != "sqlite":
+        return
+    removed, indexed = [], []
+    for row in rows:
+        if row["entity_type"] != Asset.__tablename__:
+            continue
+        if row["operation"] == "delete":
+            removed.append({"id": row["entity_id"]})
+        elif row["operation"] == "create" or any(field in row["diff"] for field in INDEXED_FIELDS):
+            snapshot = row["snapshot"]
+            removed.append({"id": row["entity_id"]})
+            indexed.append({
+                "id": row["entity_id"],
+                "name": snapshot.get("name") or "",
+                "description": snapshot.get("description") or "",
+            })
+    if removed:
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), removed)
+    if indexed:
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (:id, :name, :description)"), indexed
+        )
+
+
+def _sqlite_search(session, words, limit, offset):
+    match = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+    return session.execute(
+        text(
+            f"SELECT {FTS_TABLE}.rowid AS id, -bm25({FTS_TABLE}, :name_weight, :description_weight) AS score "
+            f"FROM {FTS_TABLE} JOIN assets ON assets.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match AND assets.is_deleted = 0 "
+            "ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "name_weight": NAME_WEIGHT, "description_weight": DESCRIPTION_WEIGHT,
+         "limit": limit, "offset": offset},
+    ).all()
+
+
+def _mysql_search(session, words, limit, offset):
+    against = " ".join(f"+{word}*" for word in words)
+    return session.execute(
+        text(
+            "SELECT id, MATCH(name, description) AGAINST (:against IN BOOLEAN MODE) AS score FROM assets "
+            "WHERE MATCH(name, description) AGAINST (:against IN BOOLEAN MODE) AND is_deleted = 0 "
+            "ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset"
+        ),
+        {"against": against, "limit": limit, "offset": offset},
+    ).all()
+
+
+def _like_search(session, words, limit, offset):
+    query = session.query(Asset.id).filter(Asset.is_deleted.is_(False))
+    for word in words:
+        pattern = f"%{word}%"
+        query = query.filter(Asset.name.ilike(pattern) | Asset.description.ilike(pattern))
+    rows = query.order_by(Asset.id.desc()).limit(limit).offset(offset).all()
+    return [(row.id, 0.0) for row in rows]
+
+
+def search_assets(session, query, limit=20, offset=0):
+    """Ranked [(asset_id, score)] for `query`, best first; at most `limit` rows after `offset`."""
+    words = search_words(query)
+    if not words:
+        return []
+    dialect = session.get_bind(mapper=Asset).dialect.name
+    if dialect == "sqlite":
+        rows = _sqlite_search(session, words, limit, offset)
+    elif dialect == "mysql":
+        rows = _mysql_search(session, words, limit, offset)
+    else:
+        rows = _like_search(session, words, limit, offset)
+    return [(row_id, float(score)) for row_id, score in rows]
+
+
+def rebuild_index(session):
+    """Repopulate the SQLite FTS table from `assets`; returns the number of rows indexed."""
+    connection = session.connection()
+    connection.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, description)"))
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    result = connection.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, name, description) SELECT id, name, description FROM assets"))
+    session.commit()
+    return result.rowcount
+
+
+search_cli = AppGroup("search", help="Full-text search commands.")
+
+
+@search_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the SQLite asset search index (MySQL maintains its FULLTEXT index itself)."""
+    if db.session.get_bind(mapper=Asset).dialect.name != "sqlite":
+        click.echo("Nothing to do: only the SQLite FTS index is maintained by the application.")
+        return
+    click.echo(f"{rebuild_index(db.session)} assets indexed")
@@ -0,0 +1,103 @@
+"""Compiled response serializers.
+
+For each response schema a row type (a TypedDict with the schema's fields and types) and
+its `TypeAdapter` are built once and cached. Rows produced by the `*_to_response` helpers
+are already well-formed server data, so they are dumped straight to JSON bytes in a single
+call, skipping both per-row validation and the `jsonify` re-encode.
+
+Columns that are stored as JSON text (history snapshots and diffs) can skip parsing as well:
+`dump_one_raw` splices their text into the output bytes unchanged.
+"""
+from functools import lru_cache
+from typing import get_args, get_origin
+
+from flask import current_app
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+
+def _row_annotation(annotation):
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return row_type(annotation)
+    if get_origin(annotation) is list:
+        (item,) = get_args(annotation)
+        return list[_row_annotation(item)]
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def row_type(schema):
+    """TypedDict with the fields and types of `schema`; nested models become row types too."""
+    fields = {name: _row_annotation(field.annotation) for name, field in schema.model_fields.items()}
+    return TypedDict(f"{schema.__name__}Row", fields)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema):
+    return TypeAdapter(list[row_type(schema)])
+
+
+@lru_cache(maxsize=None)
+def adapter(schema):
+    return TypeAdapter(row_type(schema))
+
+
+def dump_list(schema, rows) -> bytes:
+    """Serialize response dicts as a JSON array shaped by `schema`."""
+    return list_adapter(schema).dump_json(rows)
+
+
+def dump_one(schema, row) -> bytes:
+    return adapter(schema).dump_json(row)
+
+
+@lru_cache(maxsize=None)
+def raw_segments(schema, raw_fields):
+    """`schema`'s fields in order, split into runs of regular fields and single raw fields.
+
+    A run of regular fields is (names, adapter) for a row type of just those fields; a raw
+    field is (name, its JSON-encoded key).
+    """
+    segments = []
+    run = {}
+
+    def close_run():
+        if run:
+            names = tuple(run)
+            segments.append((names, TypeAdapter(TypedDict(f"{schema.__name__}Part{len(segments)}", dict(run)))))
+            run.clear()
+
+    for name, field in schema.model_fields.items():
+        if name in raw_fields:
+            close_run()
+            segments.append((name, TypeAdapter(str).dump_json(name)))
+        else:
+            run[name] = _row_annotation(field.annotation)
+    close_run()
+    return segments
+
+
+def dump_one_raw(schema, row, raw_fields) -> bytes:
+    """Like `dump_one`, but the `raw_fields` of `row` are JSON text inserted as is, not parsed.
+
+    The object is assembled in field order from the dumped runs of regular fields and the raw
+    texts, so the output is never searched. `raw_fields` is a tuple; None is written as `null`.
+    """
+    parts = []
+    for names, part in raw_segments(schema, raw_fields):
+        if isinstance(names, tuple):
+            parts.append(part.dump_json({name: row[name] for name in names})[1:-1])
+        else:
+            text = row[names]
+            parts.append(part + b":" + (text.encode() if text is not None else b"null"))
+    return b"{" + b",".join(parts) + b"}"
+
+
+def join_list(items) -> bytes:
+    """JSON array from already-serialized items; same bytes as `dump_list` over their rows."""
+    return b"[" + b",".join(items) + b"]"
+
+
+def json_response(body: bytes, status: int = 200):
+    """Response for pre-serialized JSON; ends with a newline like `jsonify`."""
+    return current_app.response_class(body + b"\n", status=status, mimetype="application/json")
@@ -0,0 +1,44 @@
+"""Production entry point: gunicorn with WEB_WORKERS processes x WEB_THREADS threads.
+
+Usage: python app/serve.py
+
+The app is created inside each worker after fork (no preload), so every worker opens its
+own connection pool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW. On SIGTERM gunicorn stops
+accepting connections, lets in-flight requests finish within WEB_GRACEFUL_TIMEOUT and the
+worker_exit hook closes the pool.
+"""
+from gunicorn.app.base import BaseApplication
+
+from app import create_app
+from models import db
+from config import Config
+
+
+def _dispose_engines(server, worker):
+    app = worker.wsgi
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+class VersioningServer(BaseApplication):
+    def __init__(self, config=Config):
+        self.app_config = config
+        super().__init__()
+
+    def load_config(self):
+        self.cfg.set("bind", self.app_config.WEB_BIND)
+        self.cfg.set("workers", self.app_config.WEB_WORKERS)
+        self.cfg.set("threads", self.app_config.WEB_THREADS)
+        self.cfg.set("worker_class", "gthread")
+        self.cfg.set("timeout", self.app_config.WEB_TIMEOUT)
+        self.cfg.set("graceful_timeout", self.app_config.WEB_GRACEFUL_TIMEOUT)
+        self.cfg.set("preload_app", False)
+        self.cfg.set("worker_exit", _dispose_engines)
+
+    def load(self):
+        return create_app(self.app_config)
+
+
+if __name__ == "__main__":
+    VersioningServer().run()
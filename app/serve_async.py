@@ -0,0 +1,35 @@
+"""Entry point of the read-only async API: uvicorn with ASYNC_WORKERS processes.
+
+Usage: python app/serve_async.py
+
+Each worker process imports the app factory and builds its own async engine and pool
+(ASYNC_DB_POOL_SIZE connections plus DB_MAX_OVERFLOW); the pool is disposed on shutdown.
+Run it next to app/serve.py and send the read routes listed in async_api.py here.
+"""
+from pathlib import Path
+import sys
+
+import uvicorn
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config  # noqa: E402
+
+
+def main(config=Config):
+    host, _, port = config.ASYNC_BIND.rpartition(":")
+    uvicorn.run(
+        "async_api:create_async_app",
+        factory=True,
+        host=host,
+        port=int(port),
+        workers=config.ASYNC_WORKERS,
+        timeout_graceful_shutdown=config.WEB_GRACEFUL_TIMEOUT,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
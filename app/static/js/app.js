@@ -475,6 +475,7 @@
         });
 
         document.getElementById("logout-btn").addEventListener("click", function () {
+            if (getToken()) apiPost("/auth/logout", {}).catch(function () {});
             setToken(null);
             updateUserBar(null);
             showAuthModal();
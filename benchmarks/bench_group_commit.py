@@ -0,0 +1,104 @@
+"""Group commit: throughput and latency of concurrent small writes, off vs. on per delay.
+
+Client threads send `POST /api/signals` and `PATCH /api/signals/<id>` (alternating) through the
+Flask test client, against a fresh file SQLite database per run (one fsync per commit).
+Prints writes/s, p50/p99 latency and the average number of operations per transaction.
+
+Usage: python benchmarks/bench_group_commit.py [--clients 16] [--writes 100] [--max-batch 64]
+       [--delays 1,5,20]
+"""
+import argparse
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT))
+
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+from group_commit import group_commit  # noqa: E402
+from models import db  # noqa: E402
+
+
+def run(directory, clients, writes, delay_ms, max_batch):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{directory}/group_commit_{delay_ms}.db"
+        GROUP_COMMIT = delay_ms is not None
+        GROUP_COMMIT_MAX_DELAY_MS = delay_ms or 0
+        GROUP_COMMIT_MAX_BATCH = max_batch
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    login = {"username": app.config["DEMO_USERNAME"], "password": app.config["DEMO_PASSWORD"]}
+    headers = {"Authorization": "Bearer " + client.post("/api/auth/login", json=login).get_json()["access_token"]}
+    body = {"frequency_from": 1, "frequency_to": 2, "modulation": "AM", "power": 1}
+    before = dict(group_commit.stats())
+    latencies = []
+    errors = []
+
+    def worker():
+        own = app.test_client()
+        created = None
+        for i in range(writes):
+            started = time.perf_counter()
+            if created is None or i % 2 == 0:
+                response = own.post("/api/signals", json=body, headers=headers)
+                if response.status_code == 201:
+                    created = response.get_json()
+            else:
+                response = own.patch(
+                    f"/api/signals/{created['id']}",
+                    json={"power": i, "lock_version": created["lock_version"]},
+                    headers=headers,
+                )
+                if response.status_code == 200:
+                    created = response.get_json()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code not in (200, 201):
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    with app.app_context():
+        db.engine.dispose()
+
+    stats = group_commit.stats()
+    batches = stats["batches"] - before["batches"]
+    per_commit = (stats["operations"] - before["operations"]) / batches if batches else 1.0
+    latencies.sort()
+    name = "off" if delay_ms is None else f"on {delay_ms:g}ms"
+    print(
+        f"group commit {name:9} writes={len(latencies)} {len(latencies) / elapsed:7.0f}/s "
+        f"p50={statistics.median(latencies) * 1000:6.1f}ms p99={latencies[int(len(latencies) * 0.99)] * 1000:6.1f}ms "
+        f"ops/commit={per_commit:.1f} errors={len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=100, help="writes per client")
+    parser.add_argument("--max-batch", type=int, default=64, help="GROUP_COMMIT_MAX_BATCH")
+    parser.add_argument("--delays", default="1,5,20", help="GROUP_COMMIT_MAX_DELAY_MS values to try")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        run(directory, args.clients, args.writes, None, args.max_batch)
+        for delay in args.delays.split(","):
+            run(directory, args.clients, args.writes, float(delay), args.max_batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Serialize 10k-row list responses: per-row dicts + jsonify vs cached TypeAdapter -> JSON bytes.
+
+Usage: python benchmarks/bench_serializers.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+from datetime import datetime
+import gc
+import json
+from pathlib import Path
+import sys
+import time
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from models import Asset, EntityVersion, Signal  # noqa: E402
+from schemas import (  # noqa: E402
+    AssetResponse,
+    SignalResponse,
+    VersionResponse,
+    asset_to_response,
+    signal_to_response,
+    version_to_response,
+)
+from serializers import dump_list, json_response  # noqa: E402
+
+
+def _signals(rows):
+    return [
+        Signal(
+            id=i, frequency_from=100.0 + i, frequency_to=200.0 + i, modulation="QPSK", power=-30.5,
+            created_by="bench", updated_by="bench", lock_version=1,
+        )
+        for i in range(1, rows + 1)
+    ]
+
+
+def _assets(rows, signals):
+    return [
+        Asset(
+            id=i, name=f"asset {i}", description="benchmark asset " * 4, signals=signals[i % 50:i % 50 + 5],
+            created_by="bench", updated_by="bench", lock_version=1,
+        )
+        for i in range(1, rows + 1)
+    ]
+
+
+def _versions(rows):
+    now = datetime.utcnow()
+    return [
+        EntityVersion(
+            id=i, entity_type="signals", entity_id=i, version=1, operation="update",
+            snapshot={"id": i, "frequency_from": 1.0, "frequency_to": 2.0, "modulation": "AM", "power": 3.0,
+                      "is_deleted": False, "deleted_at": None, "deleted_by": None},
+            diff={"power": {"old": 2.0, "new": 3.0}}, hash="0" * 64, changed_at=now, changed_by="bench",
+        )
+        for i in range(1, rows + 1)
+    ]
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask("bench")
+    signals = _signals(args.rows)
+    cases = [
+        ("signals", signals, signal_to_response, SignalResponse),
+        ("assets", _assets(args.rows, signals), asset_to_response, AssetResponse),
+        ("versions", _versions(args.rows), version_to_response, VersionResponse),
+    ]
+    with app.test_request_context():
+        for name, rows, to_dict, schema in cases:
+            def legacy():
+                return jsonify([to_dict(row) for row in rows]).get_data()
+
+            def compiled():
+                return json_response(dump_list(schema, [to_dict(row) for row in rows])).get_data()
+
+            if json.loads(legacy()) != json.loads(compiled()):
+                raise SystemExit(f"{name}: outputs differ")
+            legacy_s = _best(legacy, args.repeat)
+            compiled_s = _best(compiled, args.repeat)
+            print(
+                f"{name:8} rows={args.rows} jsonify={legacy_s * 1000:.1f}ms "
+                f"compiled={compiled_s * 1000:.1f}ms speedup={legacy_s / compiled_s:.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""History responses: raw JSON passthrough vs. parse and re-encode, and jsonify per JSON provider.
+
+`legacy` loads EntityVersion rows (snapshot and diff parsed into dicts) and dumps them with
+`dump_one`, as `/api/versions` did before; `raw` selects the JSON columns as text and splices
+them into the output (`history.dump_version`). Runs against an in-memory SQLite database.
+
+Usage: python benchmarks/bench_version_json.py [--versions 2000] [--fields 40] [--repeat 5]
+"""
+import argparse
+import gc
+from pathlib import Path
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from history import dump_version, select_versions  # noqa: E402
+from json_provider import JSON_PROVIDERS  # noqa: E402
+from models import EntityVersion, _version_values, db  # noqa: E402
+from schemas import VersionResponse, version_to_response  # noqa: E402
+from serializers import dump_one, join_list  # noqa: E402
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--versions", type=int, default=2000)
+    parser.add_argument("--fields", type=int, default=40, help="fields per snapshot")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask("bench")
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        snapshot = {f"field_{i}": f"value {i}" for i in range(args.fields)}
+        rows = []
+        for version in range(1, args.versions + 1):
+            snapshot = {**snapshot, "field_0": f"value {version}"}
+            rows.append(_version_values(
+                "signals", 1, version, "update", snapshot,
+                {"field_0": {"old": f"value {version - 1}", "new": f"value {version}"}}, "bench",
+            ))
+        db.session.execute(EntityVersion.__table__.insert(), rows)
+        db.session.commit()
+
+        def legacy():
+            versions = EntityVersion.query.filter_by(entity_type="signals", entity_id=1).all()
+            return join_list([dump_one(VersionResponse, version_to_response(v)) for v in versions])
+
+        def raw():
+            versions = db.session.execute(select_versions(
+                EntityVersion.entity_type == "signals", EntityVersion.entity_id == 1
+            )).all()
+            return join_list([dump_version(row) for row in versions])
+
+        legacy_s, raw_s = _best(legacy, args.repeat), _best(raw, args.repeat)
+        print(
+            f"versions list  n={args.versions} legacy={legacy_s * 1000:.1f}ms raw={raw_s * 1000:.1f}ms "
+            f"speedup={legacy_s / raw_s:.1f}x bytes={len(raw())}"
+        )
+
+    payload = {"items": [{key: value for key, value in row.items() if key != "changed_at"} for row in rows]}
+    with app.test_request_context():
+        timings = {}
+        for name, provider in JSON_PROVIDERS.items():
+            app.json = provider(app)
+            timings[name] = _best(lambda: jsonify(payload), args.repeat)
+        print(
+            f"jsonify        n={args.versions} "
+            + " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in timings.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Versioning overhead per entity: snapshot/diff helpers and whole flushes (create, update).
+
+The snapshot helpers are compared with the previous per-call implementations (exclude set and
+`__table__.columns` walk on every call, `hasattr`/`getattr` probes), kept below as `legacy_*`.
+Flushes run against an in-memory SQLite database, with and without the versioning listeners.
+
+Usage: python benchmarks/bench_versioning.py [--entities 2000] [--repeat 5]
+"""
+import argparse
+import gc
+from pathlib import Path
+import sys
+import time
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event, inspect  # noqa: E402
+
+import models  # noqa: E402
+from models import Asset, EntityVersion, Signal, db  # noqa: E402
+
+
+def legacy_serialize_columns(entity):
+    exclude = set(getattr(entity, "__version_exclude__", set()))
+    data = {}
+    for column in entity.__table__.columns:
+        if column.name in exclude:
+            continue
+        data[column.name] = models._json_value(getattr(entity, column.name))
+    return data
+
+
+def legacy_serialize_entity(entity):
+    data = legacy_serialize_columns(entity)
+    if isinstance(entity, Asset):
+        data["signal_ids"] = entity.signal_ids
+    return data
+
+
+def legacy_compute_diff(entity):
+    mapper_state = inspect(entity)
+    diff = {}
+    exclude = set(getattr(entity, "__version_exclude__", set()))
+    for column in entity.__table__.columns:
+        if column.name in exclude:
+            continue
+        history = mapper_state.attrs[column.name].history
+        if history.has_changes():
+            old_value = models._json_value(history.deleted[0]) if history.deleted else None
+            new_value = models._json_value(history.added[0]) if history.added else models._json_value(getattr(entity, column.name))
+            diff[column.name] = {"old": old_value, "new": new_value}
+    return diff
+
+
+def legacy_is_versioned_entity(entity):
+    return (
+        hasattr(entity, "__table__")
+        and getattr(entity, "__versioned__", False)
+        and not isinstance(entity, EntityVersion)
+    )
+
+
+def _best(fn, repeat, setup=None):
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup() if setup else None
+        gc.collect()
+        started = time.perf_counter()
+        fn(state) if setup else fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _report(name, count, legacy_s, current_s):
+    print(
+        f"{name:18} n={count} legacy={legacy_s / count * 1e6:.2f}us "
+        f"registry={current_s / count * 1e6:.2f}us speedup={legacy_s / current_s:.1f}x"
+    )
+
+
+def bench_helpers(app, entities, repeat):
+    with app.app_context():
+        signals = Signal.query.limit(entities).all()
+        assets = Asset.query.limit(entities).all()
+        for entity in signals:
+            entity.power += 1
+        objects = signals + assets
+        for legacy, current in [
+            (legacy_serialize_entity, models._serialize_entity),
+            (legacy_compute_diff, models._compute_diff),
+            (legacy_is_versioned_entity, models._is_versioned_entity),
+        ]:
+            if [legacy(o) for o in objects] != [current(o) for o in objects]:
+                raise SystemExit(f"{current.__name__}: outputs differ")
+            _report(
+                current.__name__, len(objects),
+                _best(lambda: [legacy(o) for o in objects], repeat),
+                _best(lambda: [current(o) for o in objects], repeat),
+            )
+        db.session.rollback()
+
+
+def _flush_listeners():
+    session_class = db.session.__class__
+    return [
+        (session_class, "before_flush", models.collect_version_events),
+        (session_class, "after_flush_postexec", models.create_entity_versions),
+    ]
+
+
+def bench_flush(app, entities, repeat):
+    def create():
+        signals = [
+            Signal(frequency_from=i, frequency_to=i + 1, modulation="AM", power=1.0, created_by="b", updated_by="b")
+            for i in range(entities)
+        ]
+        db.session.add_all(signals)
+        db.session.add_all(
+            Asset(name=f"a{i}", description="d", signals=signals[i:i + 3], created_by="b", updated_by="b")
+            for i in range(entities)
+        )
+        db.session.commit()
+
+    def update():
+        for signal in Signal.query.all():
+            signal.power += 1
+        db.session.commit()
+
+    results = {}
+    for versioned in (False, True):
+        if not versioned:
+            for target, name, fn in _flush_listeners():
+                event.remove(target, name, fn)
+        with app.app_context():
+            def reset():
+                db.drop_all()
+                db.create_all()
+
+            results[versioned] = (
+                _best(lambda _: create(), repeat, setup=reset),
+                _best(lambda _: update(), repeat, setup=lambda: (reset(), create())),
+            )
+        if not versioned:
+            for target, name, fn in _flush_listeners():
+                event.listen(target, name, fn)
+    for index, name in enumerate(("create", "update")):
+        plain, versioned = results[False][index], results[True][index]
+        count = entities * 2 if name == "create" else entities
+        print(
+            f"flush {name:12} n={count} plain={plain / count * 1e6:.1f}us "
+            f"versioned={versioned / count * 1e6:.1f}us overhead={(versioned - plain) / count * 1e6:.1f}us/entity"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask("bench")
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        signals = [
+            Signal(frequency_from=i, frequency_to=i + 1, modulation="AM", power=1.0, created_by="b", updated_by="b")
+            for i in range(args.entities)
+        ]
+        db.session.add_all(signals)
+        db.session.add_all(
+            Asset(name=f"a{i}", description="d", signals=signals[i:i + 3], created_by="b", updated_by="b")
+            for i in range(args.entities)
+        )
+        db.session.commit()
+
+    bench_helpers(app, args.entities, args.repeat)
+    bench_flush(app, args.entities, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Closed-loop HTTP load harness for a running server.
+
+Usage:
+    python benchmarks/load.py --url http://127.0.0.1:8000 --path /api/signals --clients 16 --duration 10
+
+Logs in with the demo user (at `--login-url`, default `--url`: the async read API has no
+login route, so point it at the Flask app), then each client thread issues requests back to back over a
+keep-alive connection and the harness prints throughput and latency percentiles.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _login(host, port, username, password):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    body = json.dumps({"username": username, "password": password})
+    conn.request("POST", "/api/auth/login", body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    conn.close()
+    if response.status != 200:
+        raise SystemExit(f"login failed: {response.status} {payload}")
+    return payload["access_token"]
+
+
+def _client(host, port, path, headers, deadline, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as exc:
+            errors.append(repr(exc))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--login-url", default=None, help="Server issuing the token (default: --url).")
+    parser.add_argument("--path", default="/api/signals")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--username", default="test")
+    parser.add_argument("--password", default="test")
+    args = parser.parse_args()
+
+    target = urlsplit(args.url)
+    host, port = target.hostname, target.port or 80
+    login = urlsplit(args.login_url) if args.login_url else target
+    token = _login(login.hostname, login.port or 80, args.username, args.password)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=_client, args=(host, port, args.path, headers, deadline, latencies, errors))
+        for _ in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        raise SystemExit(f"no successful requests ({len(errors)} errors)")
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"{args.path} clients={args.clients} requests={len(latencies)} errors={len(errors)} "
+        f"rps={len(latencies) / elapsed:.1f} p50={p50:.1f}ms p99={p99:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,15 @@
 import os
 
+# Async drivers for the read-only API (app/async_api.py)
+ASYNC_DRIVERS = {"mysql+pymysql://": "mysql+aiomysql://", "sqlite://": "sqlite+aiosqlite://"}
+
+
+def _async_url(url):
+    for sync_prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url and url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
 
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret")
@@ -12,10 +22,91 @@ class Config:
     SQLALCHEMY_DATABASE_URI = _database_url
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Production serving (app/serve.py): worker processes x threads per worker
+    WEB_BIND = os.environ.get("WEB_BIND", "127.0.0.1:8000")
+    WEB_WORKERS = int(os.environ.get("WEB_WORKERS", 2))
+    WEB_THREADS = int(os.environ.get("WEB_THREADS", 4))
+    WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", 30))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+
+    # Connection pool, per worker process: one connection per thread plus a small overflow
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", WEB_THREADS))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 2))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": True, "pool_recycle": DB_POOL_RECYCLE}
+    if not _database_url.startswith("sqlite"):  # SQLite pools do not take size arguments
+        SQLALCHEMY_ENGINE_OPTIONS.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
+    # Read replica: GET /api requests read from this bind unless the client wrote recently
+    REPLICA_DATABASE_URL = os.environ.get("REPLICA_DATABASE_URL")
+    if REPLICA_DATABASE_URL and REPLICA_DATABASE_URL.startswith("mysql://"):
+        REPLICA_DATABASE_URL = REPLICA_DATABASE_URL.replace("mysql://", "mysql+pymysql://", 1)
+    SQLALCHEMY_BINDS = {"replica": REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+
+    # Async read-only API (app/serve_async.py): uvicorn processes, each with one event loop and pool
+    ASYNC_BIND = os.environ.get("ASYNC_BIND", "127.0.0.1:8001")
+    ASYNC_WORKERS = int(os.environ.get("ASYNC_WORKERS", 2))
+    ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", 16))
+    ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or _async_url(_database_url)
+    ASYNC_REPLICA_DATABASE_URL = _async_url(REPLICA_DATABASE_URL)
+
+    # Set-based bulk update/delete: ids per UPDATE statement and per transaction
+    BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", 500))
+
+    # Trash retention (flask trash purge): hard-delete items soft-deleted longer than this
+    TRASH_RETENTION_DAYS = float(os.environ.get("TRASH_RETENTION_DAYS", 30))
+    TRASH_PURGE_CHUNK_SIZE = int(os.environ.get("TRASH_PURGE_CHUNK_SIZE", 200))
+    TRASH_PURGE_PAUSE = float(os.environ.get("TRASH_PURGE_PAUSE", 0.2))
+    TRASH_PURGE_INTERVAL = float(os.environ.get("TRASH_PURGE_INTERVAL", 3600))
+
+    # Delta sync (GET /api/sync): history rows younger than this are not served yet, because a
+    # transaction still in flight may hold a lower id; keep it above the longest write transaction
+    SYNC_SETTLE_SECONDS = float(os.environ.get("SYNC_SETTLE_SECONDS", 5))
+
+    # History audit: rows per Merkle checkpoint (flask audit checkpoint)
+    HISTORY_CHECKPOINT_SIZE = int(os.environ.get("HISTORY_CHECKPOINT_SIZE", 1024))
+    # GET /api/versions/<type>/<id>/<version>/proof: Merkle trees of checkpoints cached per process
+    HISTORY_PROOF_CACHE_SIZE = int(os.environ.get("HISTORY_PROOF_CACHE_SIZE", 32))
+
+    # GET /api/versions/<type>/<id>/diff: cached net diffs per process (history rows are immutable)
+    VERSION_DIFF_CACHE_SIZE = int(os.environ.get("VERSION_DIFF_CACHE_SIZE", 1024))
+    # GET /api/versions/<type>/<id>: serialized version lists per process, extended as versions are added
+    VERSION_HISTORY_CACHE_SIZE = int(os.environ.get("VERSION_HISTORY_CACHE_SIZE", 512))
+    # ... and at most this many serialized bytes in total; longer histories are not cached
+    VERSION_HISTORY_CACHE_BYTES = int(os.environ.get("VERSION_HISTORY_CACHE_BYTES", 64 * 1024 * 1024))
+
+    # Single-flight GETs (coalescing.py): identical concurrent list requests share one query;
+    # READ_COALESCING_TTL > 0 also reuses a finished result for that many seconds
+    READ_COALESCING = os.environ.get("READ_COALESCING", "on") != "off"
+    READ_COALESCING_TTL = float(os.environ.get("READ_COALESCING_TTL", 0))
+    READ_COALESCING_CACHE_SIZE = int(os.environ.get("READ_COALESCING_CACHE_SIZE", 256))
+
+    # Activity rollups (flask history roll-up): passes every INTERVAL seconds with --loop; history
+    # rows younger than SETTLE_SECONDS wait for the next pass (a lower id may still be in flight)
+    ACTIVITY_ROLLUP_INTERVAL = float(os.environ.get("ACTIVITY_ROLLUP_INTERVAL", 60))
+    ACTIVITY_ROLLUP_SETTLE_SECONDS = float(os.environ.get("ACTIVITY_ROLLUP_SETTLE_SECONDS", 5))
+
+    # JSON provider for jsonify and request bodies (app/json_provider.py): "orjson" or "default"
+    JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "orjson")
+
+    # Group commit (group_commit.py): concurrent signal creates and scalar PATCHes of a worker
+    # share one transaction, flushed after MAX_BATCH operations or MAX_DELAY_MS after the first
+    GROUP_COMMIT = os.environ.get("GROUP_COMMIT", "off") == "on"
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get("GROUP_COMMIT_MAX_DELAY_MS", 5))
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", 64))
+    # Seconds a queued write may wait before it is cancelled with 503; keep well below WEB_TIMEOUT
+    GROUP_COMMIT_WAIT_TIMEOUT = float(os.environ.get("GROUP_COMMIT_WAIT_TIMEOUT", 10))
+
     # JWT
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY") or SECRET_KEY
     JWT_ACCESS_TOKEN_EXPIRES = int(os.environ.get("JWT_ACCESS_TOKEN_EXPIRES", 60 * 60 * 24))  # 24h default
     JWT_ALGORITHM = "HS256"
+    # Verified-token cache (per process); entries expire after JWT_CACHE_TTL seconds or at token exp
+    JWT_CACHE_SIZE = int(os.environ.get("JWT_CACHE_SIZE", 10000))
+    JWT_CACHE_TTL = int(os.environ.get("JWT_CACHE_TTL", 300))
+    # Logouts are shared through the revoked_tokens table; each process reloads it at most this often
+    JWT_REVOCATION_REFRESH = float(os.environ.get("JWT_REVOCATION_REFRESH", 1))
 
     # Demo auth (for development only; replace with real auth in production)
     DEMO_USERNAME = "test"
@@ -0,0 +1,41 @@
+"""history hash chain and merkle checkpoints
+
+Revision ID: 5b8e2c1d9a47
+Revises: a1b2c3d4e5f6
+Create Date: 2026-03-09
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "5b8e2c1d9a47"
+down_revision = "a1b2c3d4e5f6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable: rows written before this migration get chained by `flask audit backfill-chain`.
+    with op.batch_alter_table("entity_versions", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("chain_hash", sa.String(length=64), nullable=True))
+
+    op.create_table(
+        "history_checkpoints",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("first_id", sa.Integer(), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("leaf_count", sa.Integer(), nullable=False),
+        sa.Column("root", sa.String(length=64), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("last_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("history_checkpoints")
+
+    with op.batch_alter_table("entity_versions", schema=None) as batch_op:
+        batch_op.drop_column("chain_hash")
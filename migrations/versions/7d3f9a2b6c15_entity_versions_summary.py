@@ -0,0 +1,27 @@
+"""entity_versions change summary
+
+Revision ID: 7d3f9a2b6c15
+Revises: 5b8e2c1d9a47
+Create Date: 2026-03-16
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "7d3f9a2b6c15"
+down_revision = "5b8e2c1d9a47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable: existing rows are filled by `flask history backfill-summaries`.
+    with op.batch_alter_table("entity_versions", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("summary", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("entity_versions", schema=None) as batch_op:
+        batch_op.drop_column("summary")
@@ -0,0 +1,29 @@
+"""changes feed indexes
+
+Revision ID: 9c4e1f7a3b28
+Revises: 7d3f9a2b6c15
+Create Date: 2026-03-18
+
+"""
+
+from alembic import op
+
+
+revision = "9c4e1f7a3b28"
+down_revision = "7d3f9a2b6c15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("entity_versions", schema=None) as batch_op:
+        batch_op.create_index("ix_entity_versions_changed_at", ["changed_at"], unique=False)
+        batch_op.create_index("ix_entity_versions_changed_by_changed_at", ["changed_by", "changed_at"], unique=False)
+        batch_op.create_index("ix_entity_versions_entity_type_changed_at", ["entity_type", "changed_at"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("entity_versions", schema=None) as batch_op:
+        batch_op.drop_index("ix_entity_versions_entity_type_changed_at")
+        batch_op.drop_index("ix_entity_versions_changed_by_changed_at")
+        batch_op.drop_index("ix_entity_versions_changed_at")
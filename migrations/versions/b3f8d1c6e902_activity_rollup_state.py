@@ -0,0 +1,43 @@
+"""activity rollup job high-water mark
+
+Revision ID: b3f8d1c6e902
+Revises: a4d9e2b7c615
+Create Date: 2026-10-19
+
+Rollups were maintained in the write transactions until now, so the mark starts at the
+newest history row: `flask history roll-up` counts only rows written after the upgrade.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "b3f8d1c6e902"
+down_revision = "a4d9e2b7c615"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    state = op.create_table(
+        "activity_rollup_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("last_version_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    versions = sa.table("entity_versions", sa.column("id", sa.Integer))
+    op.execute(
+        state.insert().from_select(
+            ["id", "last_version_id", "updated_at"],
+            sa.select(
+                sa.literal(1),
+                sa.func.coalesce(sa.func.max(versions.c.id), 0),
+                sa.func.current_timestamp(),
+            ).select_from(versions),
+        )
+    )
+
+
+def downgrade():
+    op.drop_table("activity_rollup_state")
@@ -0,0 +1,62 @@
+"""lock_version on history rows
+
+Revision ID: c7e2a9f4d318
+Revises: e8a3c6d1f594
+Create Date: 2026-10-19
+
+Stale-PATCH merges look up the base snapshot by the client's lock_version, which differs from
+the history version number for older entities. Only the newest history row of each entity is
+backfilled, with the entity's current lock_version (its snapshot is the current state); older
+rows stay NULL, and merging onto them reports conflicts instead of guessing a base.
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from online_migrations import add_column_if_missing, chunked_ranges
+
+
+revision = "c7e2a9f4d318"
+down_revision = "e8a3c6d1f594"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column_if_missing("entity_versions", sa.Column("lock_version", sa.Integer(), nullable=True))
+    if context.is_offline_mode():
+        return
+    versions = sa.table(
+        "entity_versions",
+        sa.column("id", sa.Integer),
+        sa.column("entity_type", sa.String),
+        sa.column("entity_id", sa.Integer),
+        sa.column("lock_version", sa.Integer),
+    )
+    statement = (
+        versions.update()
+        .where(versions.c.id == sa.bindparam("row_id"))
+        .values(lock_version=sa.bindparam("lock"))
+    )
+    for table_name in ("signals", "assets"):
+        # Walk the entity table in id ranges: per range, one indexed GROUP BY finds each
+        # entity's newest history row, and one committed UPDATE batch fills it in.
+        entities = sa.table(table_name, sa.column("id", sa.Integer), sa.column("lock_version", sa.Integer))
+        newest = (
+            sa.select(entities.c.lock_version, sa.func.max(versions.c.id).label("row_id"))
+            .join(versions, sa.and_(versions.c.entity_type == table_name, versions.c.entity_id == entities.c.id))
+            .where(entities.c.id >= sa.bindparam("low"), entities.c.id < sa.bindparam("high"))
+            .group_by(entities.c.id, entities.c.lock_version)
+        )
+        for connection, low, high in chunked_ranges(f"c7e2a9f4d318_{table_name}", table_name):
+            params = [
+                {"row_id": row.row_id, "lock": row.lock_version}
+                for row in connection.execute(newest, {"low": low, "high": high})
+            ]
+            if params:
+                connection.execute(statement, params)
+
+
+def downgrade():
+    with op.batch_alter_table("entity_versions", schema=None) as batch_op:
+        batch_op.drop_column("lock_version")
@@ -0,0 +1,38 @@
+"""activity rollups
+
+Revision ID: d2f5b9c7e816
+Revises: b6a1d8e4f203
+Create Date: 2026-03-30
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "d2f5b9c7e816"
+down_revision = "b6a1d8e4f203"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "activity_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("entity_type", sa.String(length=128), nullable=False),
+        sa.Column("operation", sa.String(length=16), nullable=False),
+        sa.Column("changed_by", sa.String(length=64), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "bucket", "bucket_start", "entity_type", "operation", "changed_by", name="uq_activity_rollups_key"
+        ),
+    )
+    # Existing history is counted by `flask history rebuild-rollups`.
+
+
+def downgrade():
+    op.drop_table("activity_rollups")
@@ -0,0 +1,30 @@
+"""external keys for bulk import
+
+Revision ID: e8a3c6d1f594
+Revises: d2f5b9c7e816
+Create Date: 2026-04-06
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "e8a3c6d1f594"
+down_revision = "d2f5b9c7e816"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ("signals", "assets"):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column("external_key", sa.String(length=128), nullable=True))
+            batch_op.create_index(f"ix_{table}_external_key", ["external_key"], unique=True)
+
+
+def downgrade():
+    for table in ("assets", "signals"):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f"ix_{table}_external_key")
+            batch_op.drop_column("external_key")